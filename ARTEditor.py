@@ -1,4 +1,5 @@
 import tkinter.filedialog
+import tkinter.messagebox
 from tkinter import *
 from src.Toolbar import Toolbar
 from src.TextureEditor import TextureEditor, Modes
@@ -6,8 +7,9 @@ from tkinter import ttk
 from Resources.ArtToCart import ArtToCart
 from Resources.ArtToCart import CartToArt
 from pathlib import Path
-from src.ColorPicker import RGBA
-from src.Palette import PaletteData
+from src.core.FontManager import FONTS
+from src.core.Exporter import export, exportFrames
+from src.core.Importer import importArt, importCart
 
 
 class ARTEditor(ttk.Frame):
@@ -25,7 +27,8 @@ class ARTEditor(ttk.Frame):
 
         self.toolbar.onPaletteChange(self.__paletteChange)
         self.toolbar.onResizeChange(self.__onResize)
-        self.toolbar.onBoxToggle(self.__onModeToggle)
+        self.toolbar.onModeChange(self.__onModeChange)
+        self.toolbar.onFillMatchChange(self.__onFillMatchChange)
 
         # setup texture editor
         self.texture_editor = TextureEditor(self, 10, 10)
@@ -49,7 +52,10 @@ class ARTEditor(ttk.Frame):
         self.file_menu.add_separator()
 
         self.file_menu.add_command(label='Export texture', command=self.__exportTexture)
+        self.file_menu.add_command(label='Export texture as .cart version 2',
+                                   command=lambda: self.__exportTexture(cart_version=2))
         self.file_menu.add_command(label='Import texture', command=self.__importTexture)
+        self.file_menu.add_command(label='Export animation', command=self.__exportAnimation)
 
         self.file_menu.add_separator()
 
@@ -61,6 +67,56 @@ class ARTEditor(ttk.Frame):
         self.file_menu.add_command(label='convert to .cart', command=self.__convertCart)
         self.file_menu.add_command(label='convert to .art', command=self.__convertArt)
 
+        self.edit_menu = Menu(self.menu)
+
+        self.menu.add_cascade(label='Edit', menu=self.edit_menu)
+
+        self.edit_menu.add_command(label='Copy', accelerator='Ctrl+C', command=self.texture_editor.copySelection)
+        self.edit_menu.add_command(label='Cut', accelerator='Ctrl+X', command=self.texture_editor.cutSelection)
+        self.edit_menu.add_command(label='Paste', accelerator='Ctrl+V', command=self.texture_editor.paste)
+
+        self.edit_menu.add_separator()
+
+        self.edit_menu.add_command(label='Flip horizontally',
+                                   command=lambda: self.texture_editor.flipSelection(horizontal=True))
+        self.edit_menu.add_command(label='Flip vertically',
+                                   command=lambda: self.texture_editor.flipSelection(horizontal=False))
+        self.edit_menu.add_command(label='Rotate clockwise',
+                                   command=lambda: self.texture_editor.rotateSelection(clockwise=True))
+        self.edit_menu.add_command(label='Rotate counterclockwise',
+                                   command=lambda: self.texture_editor.rotateSelection(clockwise=False))
+
+        self.layer_menu = Menu(self.menu)
+
+        self.menu.add_cascade(label='Layer', menu=self.layer_menu)
+
+        self.layer_visible = BooleanVar()
+        self.layer_locked = BooleanVar()
+        self.active_layer = IntVar()
+
+        self.__updateLayerMenu()
+
+        self.frame_menu = Menu(self.menu)
+
+        self.menu.add_cascade(label='Frame', menu=self.frame_menu)
+
+        self.onion_previous = BooleanVar()
+        self.onion_next = BooleanVar()
+
+        self.__updateFrameMenu()
+
+        self.view_menu = Menu(self.menu)
+        self.font_menu = Menu(self.view_menu)
+
+        self.menu.add_cascade(label='View', menu=self.view_menu)
+        self.view_menu.add_cascade(label='Font', menu=self.font_menu)
+
+        self.font_name = StringVar(value=self.texture_editor.fonts.name)
+
+        for name in FONTS:
+            self.font_menu.add_radiobutton(label=name, value=name, variable=self.font_name,
+                                           command=lambda: self.texture_editor.setFontName(self.font_name.get()))
+
         # layout
         self.toolbar.grid(column=0, row=0, sticky='nsew')
         self.texture_editor.grid(column=1, row=0, sticky='NSEW')
@@ -81,92 +137,132 @@ class ARTEditor(ttk.Frame):
 
         self.texture_editor.resize(int(width), int(height))
 
-    def __onModeToggle(self, mode):
+    def __onModeChange(self, mode):
+        self.texture_editor.mode = Modes[mode]
 
-        if mode:
-            self.texture_editor.mode = Modes.BOX
-        else:
-            self.texture_editor.mode = Modes.PEN
+    def __onFillMatchChange(self, character, foreground, background):
+        self.texture_editor.setFillMatch(character, foreground, background)
+
+    def __updateLayerMenu(self):
+        """rebuilds the layer menu, which lists every layer from the topmost to the lowest one"""
+
+        layers = self.texture_editor.layers
+
+        self.layer_visible.set(layers.active_layer.visible)
+        self.layer_locked.set(layers.active_layer.locked)
+        self.active_layer.set(layers.active)
+
+        self.layer_menu.delete(0, END)
+
+        self.layer_menu.add_command(label='New layer', command=lambda: self.__layerCommand(self.texture_editor.addLayer))
+        self.layer_menu.add_command(label='Delete layer',
+                                    command=lambda: self.__layerCommand(self.texture_editor.removeLayer))
+        self.layer_menu.add_command(label='Move layer up',
+                                    command=lambda: self.__layerCommand(self.texture_editor.moveLayer, 1))
+        self.layer_menu.add_command(label='Move layer down',
+                                    command=lambda: self.__layerCommand(self.texture_editor.moveLayer, -1))
+
+        self.layer_menu.add_separator()
+
+        self.layer_menu.add_checkbutton(label='Visible', variable=self.layer_visible,
+                                        command=lambda: self.texture_editor.setLayerVisible(self.layer_visible.get()))
+        self.layer_menu.add_checkbutton(label='Locked', variable=self.layer_locked,
+                                        command=lambda: self.texture_editor.setLayerLocked(self.layer_locked.get()))
+
+        self.layer_menu.add_separator()
+
+        for index in reversed(range(len(layers.layers))):
+            self.layer_menu.add_radiobutton(label=layers.layers[index].name, value=index, variable=self.active_layer,
+                                            command=lambda: self.__layerCommand(self.texture_editor.setActiveLayer,
+                                                                                self.active_layer.get()))
+
+    def __layerCommand(self, func, *args):
+        func(*args)
+        self.__updateLayerMenu()
+
+    def __updateFrameMenu(self):
+        """rebuilds the frame menu, which shows the position of the current frame"""
+
+        frames = self.texture_editor.frames
+
+        self.frame_menu.delete(0, END)
+
+        self.frame_menu.add_command(label=f'Frame {frames.current + 1} of {len(frames)}', state=DISABLED)
+
+        self.frame_menu.add_separator()
+
+        self.frame_menu.add_command(label='New frame',
+                                    command=lambda: self.__frameCommand(self.texture_editor.addFrame, True))
+        self.frame_menu.add_command(label='New empty frame',
+                                    command=lambda: self.__frameCommand(self.texture_editor.addFrame, False))
+        self.frame_menu.add_command(label='Delete frame',
+                                    command=lambda: self.__frameCommand(self.texture_editor.removeFrame))
+
+        self.frame_menu.add_separator()
+
+        self.frame_menu.add_command(label='Previous frame',
+                                    command=lambda: self.__frameCommand(self.texture_editor.setFrame,
+                                                                        frames.current - 1))
+        self.frame_menu.add_command(label='Next frame',
+                                    command=lambda: self.__frameCommand(self.texture_editor.setFrame,
+                                                                        frames.current + 1))
+
+        self.frame_menu.add_separator()
+
+        self.frame_menu.add_checkbutton(label='Onion skin previous frame', variable=self.onion_previous,
+                                        command=self.__onionSkinChange)
+        self.frame_menu.add_checkbutton(label='Onion skin next frame', variable=self.onion_next,
+                                        command=self.__onionSkinChange)
+
+    def __frameCommand(self, func, *args):
+        func(*args)
+
+        # every frame has its own layers
+        self.__updateFrameMenu()
+        self.__updateLayerMenu()
+
+    def __onionSkinChange(self):
+        self.texture_editor.setOnionSkin(self.onion_previous.get(), self.onion_next.get())
 
     def __textureCopy(self, data):
         self.toolbar.loadData(data)
 
-    def __exportTexture(self):
-        target_dir = tkinter.filedialog.asksaveasfilename(defaultextension=".art",
-                                                   filetypes=(("Ascii Render texture file", "*.art"),
-                                                              ("Compact Ascii Render texture file", "*.cart"),
+    def __exportTexture(self, cart_version=1):
+        if cart_version == 1:
+            filetypes = (("Ascii Render texture file", "*.art"),
+                         ("Compact Ascii Render texture file", "*.cart"),
+                         ("Compressed Ascii Render texture file", "*.cartz"),
+                         ("All Files", "*.*"))
+        else:
+            # only .cart files have versions
+            filetypes = (("Compact Ascii Render texture file", "*.cart"), ("All Files", "*.*"))
+
+        target_dir = tkinter.filedialog.asksaveasfilename(defaultextension=filetypes[0][1][1:], filetypes=filetypes)
+
+        if not target_dir:
+            return
+
+        # the visible layers are exported as a single texture, flattened one block of rows at a time
+        export(self.texture_editor.layers, target_dir, cart_version)
+
+    def __exportAnimation(self):
+        target_dir = tkinter.filedialog.asksaveasfilename(defaultextension=".cart",
+                                                   filetypes=(("Compact Ascii Render texture file", "*.cart"),
+                                                              ("Compressed Ascii Render texture file", "*.cartz"),
                                                               ("All Files", "*.*")))
         if not target_dir:
             return
 
-        path = Path(target_dir)
+        # every frame is flattened while it is written, so the whole animation is never flattened at once
+        version = 3 if Path(target_dir).suffix == '.cartz' else 2
 
-        # if suffix is .art write a Asciir Texture File
-        if path.suffix == '.art':
-            with open(target_dir, 'w', encoding='utf-8') as file:
-                # write size
-                file.write(f'// size\n{self.texture_editor.width} {self.texture_editor.height}\n\n')
-
-                # write character data
-                file.write('// symbols\n')
-
-                for row in self.texture_editor.texture_data:
-                    for col in row:
-                        if col.character:
-                            file.write(col.character + ' ')
-                        else:
-                            file.write('00')
-                    file.write('\n')
-
-                file.write('\n')
-
-                # write foreground data
-                file.write('// foreground color\n')
-
-                for row in self.texture_editor.texture_data:
-                    for col in row:
-                        if col.background_color:
-                            file.write(col.foreground_color.rgbaHex().replace('#', '') + ' ')
-                        else:
-                            file.write('00000000 ')
-                    file.write('\n')
-
-                file.write('\n')
-
-                # write background data
-                file.write('// background color\n')
-
-                for row in self.texture_editor.texture_data:
-                    for col in row:
-                        if col.foreground_color:
-                            file.write(col.background_color.rgbaHex().replace('#', '') + ' ')
-                        else:
-                            file.write('00000000 ')
-                    file.write('\n')
-        # if suffix is anything else (including .cart), write a Compact Asciir File.
-        else:
-            with open(target_dir, 'wb') as file:
-                file.write(self.texture_editor.width.to_bytes(8, 'little'))
-                file.write(self.texture_editor.height.to_bytes(8, 'little'))
-
-                for row in self.texture_editor.texture_data:
-                    for data in row:
-                        if data.character:
-                            file.write(data.character.encode('utf-8'))
-                        else:
-                            file.write(b'\00')
-
-                        for color in (data.foreground_color, data.background_color):
-                            if color:
-                                for c_val in color.rgba():
-                                    file.write(c_val.to_bytes(1, 'little'))
-                            else:
-                                file.write(b'\00\00\00\00')
+        exportFrames(self.texture_editor.frames.frames, target_dir, version=version)
 
     def __importTexture(self):
         target_dir = tkinter.filedialog.askopenfilename(defaultextension=".art",
                                                          filetypes=(("Ascii Render texture file", "*.art"),
                                                                     ("Compact Ascii Render texture file", "*.cart"),
+                                                                    ("Compressed Ascii Render texture file", "*.cartz"),
                                                                     ("All Files", "*.*")))
         if not target_dir:
             return
@@ -175,35 +271,23 @@ class ARTEditor(ttk.Frame):
 
         # if suffix is .art read a Asciir Texture File
         if path.suffix == '.art':
-            data = ArtToCart.readData(path)
-
-            if not data: return
-
-            size_data, symbols_data, foreground_data, background_data = data
-
-            self.texture_editor.resize(size_data[0], size_data[1])
-
-            for i, row in enumerate(zip(symbols_data, foreground_data, background_data)):
-                for j, data in enumerate(zip(row[0], row[1], row[2])):
-                    self.texture_editor.texture_data[i][j] = PaletteData(data[0], RGBA(data[1]), RGBA(data[2]))
+            try:
+                texture = importArt(path, self.texture_editor.frames.chunked)
+            except ValueError as error:
+                tkinter.messagebox.showerror('Import texture', str(error))
+                return
 
-            self.texture_editor.rerender()
+            self.texture_editor.load(texture)
 
-        # if suffix is anything else (including .cart), read as a Compact Asciir File.
+        # if suffix is anything else (including .cart and .cartz), read as a Compact Asciir File of any version.
         else:
-            data = CartToArt.readData(path)
+            try:
+                texture = importCart(path, self.texture_editor.frames.chunked)
+            except ValueError as error:
+                tkinter.messagebox.showerror('Import texture', str(error))
+                return
 
-            if not data: return
-
-            size_data, symbols_data, foreground_data, background_data = data
-
-            self.texture_editor.resize(size_data[0], size_data[1])
-
-            for i, row in enumerate(zip(symbols_data, foreground_data, background_data)):
-                for j, data in enumerate(zip(row[0], row[1], row[2])):
-                    self.texture_editor.texture_data[i][j] = PaletteData(data[0].decode('utf-8'), RGBA(data[1]), RGBA(data[2]))
-
-            self.texture_editor.rerender()
+            self.texture_editor.load(texture)
 
     def __convertCart(self):
         target_dir = tkinter.filedialog.askopenfilename(defaultextension=".art",
@@ -224,16 +308,14 @@ class ARTEditor(ttk.Frame):
         CartToArt.convert([target_dir])
 
 
+if __name__ == '__main__':
+    root = Tk()
+    root.minsize(300, 300)
 
+    root.columnconfigure(0, weight=1)
+    root.rowconfigure(0, weight=1)
 
-root = Tk()
-root.minsize(300, 300)
-
-root.columnconfigure(0, weight=1)
-root.rowconfigure(0, weight=1)
-
-editor = ARTEditor(root)
-editor.grid(column=0, row=0, sticky='NSEW')
-
+    editor = ARTEditor(root)
+    editor.grid(column=0, row=0, sticky='NSEW')
 
-root.mainloop()
\ No newline at end of file
+    root.mainloop()
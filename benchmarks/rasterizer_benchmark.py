@@ -0,0 +1,60 @@
+"""
+measures how many full frames per second the rasterizer produces for textures of different sizes.
+run from the repository root with: python -m benchmarks.rasterizer_benchmark [--zoom ZOOM] [--repeat REPEAT]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from PIL import ImageFont
+
+from src.core.GlyphAtlas import GlyphAtlas
+from src.core.Rasterizer import rasterize
+from src.core.TextureData import TextureData, CHARACTER, FOREGROUND, BACKGROUND
+
+SIZES = (100, 500, 1000)
+
+
+def randomTexture(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+
+    texture = TextureData(width, height)
+
+    texture.cells['character'] = rng.integers(0x21, 0x7f, (height, width))
+    texture.cells['foreground'] = rng.integers(0, 256, (height, width, 4))
+    texture.cells['background'] = rng.integers(0, 256, (height, width, 4))
+    texture.cells['mask'] = CHARACTER | FOREGROUND | BACKGROUND
+
+    return texture
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmarks full texture rasterization')
+    parser.add_argument('--zoom', type=int, default=10, help='font size used for rasterizing')
+    parser.add_argument('--repeat', type=int, default=3, help='number of frames rendered per size')
+    args = parser.parse_args()
+
+    font = ImageFont.truetype('./Resources/consola.ttf', args.zoom, encoding='utf-8')
+    atlas = GlyphAtlas()
+
+    print(f'{"size":>11} {"pixels":>12} {"best (s)":>10} {"frames/s":>10}')
+
+    for size in SIZES:
+        texture = randomTexture(size, size)
+
+        # the first frame fills the glyph atlas and allocates the frame
+        frame = rasterize(texture.cells, font, atlas, (0x80, 0x80, 0x80, 0xff))
+
+        best = float('inf')
+
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rasterize(texture.cells, font, atlas, (0x80, 0x80, 0x80, 0xff), out=frame)
+            best = min(best, time.perf_counter() - start)
+
+        print(f'{size:>5}x{size:<5} {frame.shape[0] * frame.shape[1]:>12} {best:>10.3f} {1 / best:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
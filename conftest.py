@@ -0,0 +1 @@
+# the tests import the src package from the repository root, pytest adds the directory of this file to the path
@@ -0,0 +1,224 @@
+"""
+converts whole directory trees of textures between the .art, .cart and .cartz formats without the editor.
+run from the repository root with: python -m src.BatchConvert SOURCE [TARGET] --to {art,cart,cartz} [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.core.CartFormat import CART_VERSION
+from src.core.Exporter import exportArt, exportCart
+from src.core.Importer import importArt, importCart
+
+# suffixes of the texture formats which can be converted
+FORMATS = ('art', 'cart', 'cartz')
+
+# name of the file in the target directory storing the hashes of converted sources, used with --hash
+MANIFEST_NAME = '.batchconvert.json'
+
+
+def readTexture(path):
+    """reads the texture at [path], the format is chosen from its suffix"""
+
+    if Path(path).suffix == '.art':
+        return importArt(path)
+
+    return importCart(path)
+
+
+def writeTexture(texture, path, cart_version=CART_VERSION):
+    """writes [texture] to [path], the format is chosen from its suffix"""
+
+    suffix = Path(path).suffix
+
+    if suffix == '.art':
+        exportArt(texture, path)
+    elif suffix == '.cartz':
+        exportCart(texture, path, version=3)
+    else:
+        exportCart(texture, path, version=cart_version)
+
+
+def replaceTexture(texture, path, cart_version=CART_VERSION):
+    """
+    writes [texture] to a temporary file next to [path] and then moves it to [path],
+    so [path] never holds a partially written texture which is newer than its source
+    """
+
+    directory, name = os.path.split(path)
+
+    # the temporary file keeps the suffix, which selects the format
+    handle, temp_path = tempfile.mkstemp(suffix=Path(name).suffix, prefix=f'.{name}.', dir=directory or '.')
+    os.close(handle)
+
+    try:
+        writeTexture(texture, temp_path, cart_version)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def fileHash(path):
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def convertFile(source, target, cart_version=CART_VERSION, hash_source=False, known_hash=None):
+    """
+    converts the texture file [source] to [target], run in the worker processes.
+    if [hash_source] is true, the hash of [source] is returned, and the conversion is skipped
+    if [target] exists and [source] still has the [known_hash] of its last conversion.
+    returns a (status, source size in bytes, cell count, source hash, error message) tuple,
+    where status is one of 'converted', 'skipped' or 'failed'. every error is reported as a failed conversion,
+    so a single broken source does not end the whole run.
+    """
+
+    size = 0
+    source_hash = None
+
+    try:
+        size = os.path.getsize(source)
+
+        if hash_source:
+            source_hash = fileHash(source)
+
+            if source_hash == known_hash and os.path.exists(target):
+                return 'skipped', size, 0, source_hash, None
+
+        texture = readTexture(source)
+
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        replaceTexture(texture, target, cart_version)
+
+        return 'converted', size, texture.width * texture.height, source_hash, None
+    except (OSError, ValueError) as error:
+        return 'failed', size, 0, source_hash, str(error)
+    except Exception as error:
+        # unexpected errors are reported with their type, as their message alone may not explain them
+        return 'failed', size, 0, source_hash, f'{type(error).__name__}: {error}'
+
+
+def findSources(source_dir, target_format):
+    """yields every texture file below [source_dir] which is not already in [target_format]"""
+
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            suffix = Path(name).suffix[1:]
+
+            if suffix in FORMATS and suffix != target_format:
+                yield Path(root, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='converts directory trees of textures between .art and .cart files')
+    parser.add_argument('source', type=Path, help='directory searched recursively for textures')
+    parser.add_argument('target', type=Path, nargs='?',
+                        help='directory the converted textures are written to, the source directory by default')
+    parser.add_argument('--to', choices=FORMATS, required=True, help='format the textures are converted to')
+    parser.add_argument('--cart-version', type=int, choices=(1, 2), default=CART_VERSION,
+                        help='version of written .cart files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--hash', action='store_true',
+                        help='skip sources whose content hash has not changed since the last conversion, '
+                             'instead of comparing modification times')
+    parser.add_argument('--force', action='store_true', help='convert every source, even if it is up to date')
+    args = parser.parse_args()
+
+    target_dir = args.target if args.target is not None else args.source
+    manifest_path = target_dir / MANIFEST_NAME
+
+    manifest = {}
+
+    if args.hash and manifest_path.exists():
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    # hashes are stored per target format, as the same sources can be converted to several formats
+    hashes = manifest.setdefault(args.to, {})
+
+    jobs = []
+    converted = skipped = failed = cells = size = 0
+
+    # maps every target to the source converted to it, sources differing only in their suffix share a target
+    targets = {}
+
+    for source in findSources(args.source, args.to):
+        relative = source.relative_to(args.source)
+        target = target_dir / relative.with_suffix('.' + args.to)
+
+        if target in targets:
+            failed += 1
+            print(f'failed {relative}: converts to the same file as {targets[target]}')
+            continue
+
+        targets[target] = relative
+
+        if not args.force and not args.hash and target.exists() and \
+                target.stat().st_mtime >= source.stat().st_mtime:
+            skipped += 1
+            continue
+
+        known_hash = hashes.get(relative.as_posix()) if args.hash and not args.force else None
+
+        jobs.append((relative, source, target, known_hash))
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [(relative, executor.submit(convertFile, str(source), str(target), args.cart_version, args.hash,
+                                              known_hash))
+                   for relative, source, target, known_hash in jobs]
+
+        for relative, future in futures:
+            try:
+                status, file_size, file_cells, source_hash, error = future.result()
+            except Exception as pool_error:
+                # the worker process running the conversion died
+                status, error = 'failed', f'{type(pool_error).__name__}: {pool_error}'
+
+            if status == 'failed':
+                failed += 1
+                print(f'failed {relative}: {error}')
+                continue
+
+            if status == 'skipped':
+                skipped += 1
+            else:
+                converted += 1
+                cells += file_cells
+                size += file_size
+
+            if source_hash is not None:
+                hashes[relative.as_posix()] = source_hash
+
+    elapsed = time.perf_counter() - start
+
+    if args.hash:
+        os.makedirs(target_dir, exist_ok=True)
+
+        with open(manifest_path, 'w') as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+
+    print(f'converted {converted}, skipped {skipped}, failed {failed} in {elapsed:.2f} s')
+
+    if converted and elapsed > 0:
+        print(f'{converted / elapsed:.1f} files/s, {size / elapsed / 1e6:.1f} MB/s read, '
+              f'{cells / elapsed / 1e6:.1f} M cells/s')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
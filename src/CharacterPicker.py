@@ -37,14 +37,14 @@ class CharacterPicker(ttk.Frame):
         self.character_entry.grid(column=0, row=2, sticky='NSEW')
 
     def changeForeground(self, foreground):
-        self.char_vis.data.foreground_color = foreground
+        self.char_vis.data = self.char_vis.data.replace(foreground=foreground)
         self.char_vis.updateVis()
 
     def getChar(self):
         return self.char_vis.data.character
 
     def setChar(self, char):
-        self.char_vis.data.character = char
+        self.char_vis.data = self.char_vis.data.replace(character=char)
         self.char_vis.updateVis()
 
     def onCharacterChanged(self, func):
@@ -61,7 +61,7 @@ class CharacterPicker(ttk.Frame):
         if len(self.char_code.get()) > 0:
             # detect character input
             if len(self.char_code.get()) == 1:
-                self.char_vis.data.character = self.char_code.get()
+                self.char_vis.data = self.char_vis.data.replace(character=self.char_code.get())
 
                 if self.change_callback is not None:
                     self.change_callback(self.getChar())
@@ -72,7 +72,7 @@ class CharacterPicker(ttk.Frame):
             # detect integer input
             try:
                 code = int(self.char_code.get())
-                self.char_vis.data.character = chr(code)
+                self.char_vis.data = self.char_vis.data.replace(character=chr(code))
 
                 if self.change_callback is not None:
                     self.change_callback(self.getChar())
@@ -86,7 +86,7 @@ class CharacterPicker(ttk.Frame):
             if self.char_code.get()[0] == '#':
                 try:
                     code = int(self.char_code.get()[1:], 16)
-                    self.char_vis.data.character = chr(code)
+                    self.char_vis.data = self.char_vis.data.replace(character=chr(code))
 
                     if self.change_callback is not None:
                         self.change_callback(self.getChar())
@@ -2,104 +2,53 @@ from tkinter import *
 from tkinter import ttk
 from tkcolorpicker import askcolor
 from PIL import Image, ImageTk
-import cv2
 import numpy as np
 from math import ceil
 
+from src.core.RGBA import RGBA
 
-class RGBA:
-    """class for storing rgba colors and converting them to different representations"""
 
-    def __init__(self, c_val=(0, 0, 0, 255)):
-        """color values should be in range 0-255 and should be passed as lists or a string with hex values.
-        if only three values are passed, a fourth alpha value will be appended with the value 255"""
-        if type(c_val) is tuple:
-            c_val = list(c_val)
+def colorImage(color, dimensions, block_size=10):
+    """returns a PhotoImage of [dimensions] showing the RGBA [color] over a checkerboard, so the alpha value is visible"""
 
-        if type(c_val) is list or type(c_val) is tuple:
-            if len(c_val) == 3 or len(c_val) == 4:
-                if len(c_val) == 3:
-                    c_val.append(255)
-                self.__init_rgba(c_val)
-            else:
-                raise ValueError("Invalid number of channels passed to constructor ", len(c_val))
-        elif type(c_val) is str:
-            if c_val[0] == '#':
-                c_val = c_val[1:]
+    # cv2 is only needed for drawing the preview, so it is not loaded until a color picker is shown
+    import cv2
 
-            if len(c_val) == 6:
-                self.__init_hex(c_val + 'ff')
-            elif len(c_val) == 8:
-                self.__init_hex(c_val)
-            else:
-                raise ValueError("Invalid number of channels passed to constructor")
-        else:
-            raise TypeError("Invalid type passed to constructor ", type(c_val))
+    background = _checkerboard(dimensions, block_size)
+    width, height = dimensions
 
-    def __init_rgba(self, rgba: list):
-        self.red = rgba[0]
-        self.green = rgba[1]
-        self.blue = rgba[2]
-        self.alpha = rgba[3]
+    # create img with rgb values from color to overlay onto background
+    overlay = np.zeros((height, width, 3), dtype=np.uint8)
+    overlay[:] = color.rgb()
 
-    def __init_hex(self, hex_val: str):
-        self.red = int(hex_val[0:2], 16)
-        self.green = int(hex_val[2:4], 16)
-        self.blue = int(hex_val[4:6], 16)
-        self.alpha = int(hex_val[6:8], 16)
+    background = cv2.addWeighted(background, 1 - color.alpha / 255, overlay, color.alpha / 255, 0)
 
-    def rgba(self):
-        return self.red, self.green, self.blue, self.alpha
+    # convert np array to tkinter photoimage
+    img = Image.fromarray(background)
+    imgTk = ImageTk.PhotoImage(image=img)
 
-    def rgbaHex(self):
-        return f"#{''.join([format(val, 'x').zfill(2) for val in self.rgba()])}"
+    return imgTk
 
-    def rgb(self):
-        return self.red, self.green, self.blue
 
-    def rgbHex(self):
-        return f"#{''.join([format(val, 'x').zfill(2) for val in self.rgb()])}"
+# generates the background the color is added on top of
+def _checkerboard(dimensions, block_size, colors=None):
+    import cv2
 
-    def genImg(self, dimensions, block_size=10):
-        background = self.__generatePngBackground(dimensions, block_size)
-        width, height = dimensions
+    if colors is None:
+        colors = (RGBA((154, 154, 154, 255)), RGBA((100, 100, 100, 255)))
 
-        # create img with rgb values from self.color to overlay onto background
-        overlay = np.zeros((height, width, 3), dtype=np.uint8)
-        overlay[:] = self.rgb()
+    width, height = dimensions
 
-        background = cv2.addWeighted(background, 1 - self.alpha / 255, overlay, self.alpha / 255, 0)
+    # generate tiles from current size
+    png_back = np.zeros((height, width, 3), dtype=np.uint8)
 
-        # convert np array to tkinter photoimage
-        img = Image.fromarray(background)
-        imgTk = ImageTk.PhotoImage(image=img)
+    for x in range(ceil(width / block_size)):
+        for y in range(ceil(height / block_size)):
+            cv2.rectangle(png_back, (block_size * x, block_size * y),
+                          (block_size * (x + 1), block_size * (y + 1)),
+                          colors[(y + x) % 2].rgb(), -1)
 
-        return imgTk
-
-    def __str__(self):
-        return f"{self.red} {self.green} {self.blue} {self.alpha}"
-
-    def __eq__(self, other):
-        return self.red == other.red and self.green == other.green and self.blue == other.blue and self.alpha == other.alpha
-
-    # generates the background the color is added on top of
-    def __generatePngBackground(self, dimensions, block_size, colors=None):
-
-        if colors is None:
-            colors = (type(self)((154, 154, 154, 255)), type(self)((100, 100, 100, 255)))
-
-        width, height = dimensions
-
-        # generate tiles from current size
-        png_back = np.zeros((height, width, 3), dtype=np.uint8)
-
-        for x in range(ceil(width / block_size)):
-            for y in range(ceil(height / block_size)):
-                cv2.rectangle(png_back, (block_size * x, block_size * y),
-                              (block_size * (x + 1), block_size * (y + 1)),
-                              colors[(y + x) % 2].rgb(), -1)
-
-        return png_back
+    return png_back
 
 
 class ColorPicker(ttk.Frame):
@@ -173,7 +122,7 @@ class ColorPicker(ttk.Frame):
 
         # prevent preview image from being freed from memory
 
-        self.b_img = self.color.genImg(self.getColPrevSize())
+        self.b_img = colorImage(self.color, self.getColPrevSize())
 
         self.color_prev_label.configure(image=self.b_img)
 
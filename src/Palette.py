@@ -1,21 +1,7 @@
 from tkinter import *
 from tkinter import ttk
 
-
-class PaletteData:
-    def __init__(self, character=None, foreground=None, background=None):
-        self.character = character
-        self.foreground_color = foreground
-        self.background_color = background
-
-        self.char = self.character
-        self.fg = self.foreground_color
-        self.bg = self.background_color
-
-    def __eq__(self, other):
-        return other.character == self.character and \
-               type(other.foreground_color) is self.foreground_color and other.foreground_color == self.foreground_color and \
-               type(other.background_color) is self.background_color and other.background_color == self.background_color
+from src.core.PaletteData import PaletteData
 
 
 class PaletteElem(ttk.Frame):
@@ -245,7 +231,8 @@ class Palette(ttk.Frame):
         if func is not None:
             def l_callback():
                 pos = self.posFromPalette(self.selected_palettes[self.current_preset - 1])
-                self.palette_data[self.current_preset - 1][pos[0]][pos[1]].background_color = func()
+                preset = self.palette_data[self.current_preset - 1]
+                preset[pos[0]][pos[1]] = preset[pos[0]][pos[1]].replace(background=func())
                 self.__updatePalettes()
 
             self.store_background_button['command'] = l_callback
@@ -261,7 +248,8 @@ class Palette(ttk.Frame):
         if func is not None:
             def l_callback():
                 pos = self.posFromPalette(self.selected_palettes[self.current_preset - 1])
-                self.palette_data[self.current_preset - 1][pos[0]][pos[1]].foreground_color = func()
+                preset = self.palette_data[self.current_preset - 1]
+                preset[pos[0]][pos[1]] = preset[pos[0]][pos[1]].replace(foreground=func())
                 self.__updatePalettes()
 
             self.store_foreground_button['command'] = l_callback
@@ -277,7 +265,8 @@ class Palette(ttk.Frame):
         if func is not None:
             def l_callback():
                 pos = self.posFromPalette(self.selected_palettes[self.current_preset - 1])
-                self.palette_data[self.current_preset - 1][pos[0]][pos[1]].character = func()
+                preset = self.palette_data[self.current_preset - 1]
+                preset[pos[0]][pos[1]] = preset[pos[0]][pos[1]].replace(character=func())
                 self.__updatePalettes()
 
             self.store_character_button['command'] = l_callback
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class RasterPyramid:
+    """
+    caches rasters of the same texture rendered at different font sizes.
+    intermediate sizes are served by rescaling the closest cached raster instead of rasterizing the texture again.
+    at most [levels] rasters are kept, the least recently used ones are dropped first.
+    """
+
+    def __init__(self, levels=3):
+        self.levels = levels
+
+        self.__rasters = OrderedDict()
+
+    def get(self, size):
+        """returns the raster rendered at font size [size], or None if it is not cached"""
+
+        raster = self.__rasters.get(size)
+
+        if raster is not None:
+            self.__rasters.move_to_end(size)
+
+        return raster
+
+    def store(self, size, raster):
+        self.__rasters[size] = raster
+        self.__rasters.move_to_end(size)
+
+        while len(self.__rasters) > self.levels:
+            self.__rasters.popitem(last=False)
+
+    def nearest(self, size):
+        """
+        returns the (size, raster) pair closest to [size], or None if nothing is cached.
+        larger rasters are preferred, as scaling down looks better than scaling up.
+        """
+
+        if not self.__rasters:
+            return None
+
+        larger = [s for s in self.__rasters if s >= size]
+        nearest = min(larger) if larger else max(self.__rasters)
+
+        return nearest, self.__rasters[nearest]
+
+    def scaled(self, size, dimensions):
+        """returns the raster closest to font size [size] rescaled to [dimensions], or None if nothing is cached"""
+
+        nearest = self.nearest(size)
+
+        if nearest is None:
+            return None
+
+        _, raster = nearest
+
+        if raster.size == tuple(dimensions):
+            return raster
+
+        return raster.resize(dimensions, Image.BILINEAR)
+
+    def retain(self, size):
+        """drops every raster except the one rendered at [size], used when the texture has changed"""
+
+        for cached_size in list(self.__rasters):
+            if cached_size != size:
+                del self.__rasters[cached_size]
+
+    def clear(self):
+        self.__rasters.clear()
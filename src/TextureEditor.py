@@ -1,25 +1,45 @@
 from tkinter import *
 from tkinter import ttk
 
-from PIL import Image, ImageFont, ImageDraw, ImageTk
-
-from src.Palette import PaletteData
-from src.ColorPicker import RGBA
+from src.core.PaletteData import PaletteData
+from src.core.RGBA import RGBA
+from src.core.TextureData import CELL_DTYPE, CHARACTER, FOREGROUND, BACKGROUND, packCell, paintCells
+from src.core.ChunkedTextureData import ChunkedTextureData, CHUNK_SIZE
+from src.core.FrameSequence import FrameSequence
+from src.core.History import History
+from src.core.Line import lineCells
+from src.core.Fill import floodFill
+from src.core.GlyphAtlas import GlyphAtlas, blend, DEFAULT_FOREGROUND
+from src.core.FontManager import FontManager
+from src.TileRenderer import TileRenderer
 import enum
-import numpy as np
-import sys
+from itertools import groupby
 from math import floor
-import cv2
-from copy import deepcopy
+
+import numpy as np
 
 
 class Modes(enum.Enum):
     PEN = 0
     BOX = 1
+    FILL = 2
+    SELECT = 3
 
 
 class TextureEditor(ttk.Frame):
-    def __init__(self, root, width=20, height=20, zoom=20, undo_length=128, *args, **kwargs):
+    # milliseconds without scrolling before the texture is rasterized at the new zoom level
+    ZOOM_DELAY = 150
+
+    # milliseconds between two updates of the texture while drawing, about one frame at 60 fps
+    FRAME_DELAY = 16
+
+    # canvas tag of the items drawn on top of the texture, like the box preview and the selection outline
+    OVERLAY_TAG = 'overlay'
+
+    # opacity of the neighboring frames drawn as onion skin
+    ONION_OPACITY = 0.3
+
+    def __init__(self, root, width=20, height=20, zoom=20, undo_length=128, chunked=True, *args, **kwargs):
         self.root = root
         super().__init__(root, *args, **kwargs)
 
@@ -35,22 +55,30 @@ class TextureEditor(ttk.Frame):
 
         self.copy_callback = None
 
-        # defines the maximum length of the undo and redo list
+        # defines the maximum number of edits which can be undone
         self.undo_length = undo_length
 
         self.mode = Modes.PEN
 
         self.draw_data = PaletteData()
 
-        self.texture_data = [[
-            PaletteData() for x in range(self.width)
-        ] for y in range(self.height)]
+        # mask bits of the values a cell must share with the clicked cell to be filled in fill mode
+        self.fill_match = CHARACTER | FOREGROUND | BACKGROUND
+
+        # frames of the animation, chunked storage only allocates the parts of a layer which are not empty
+        self.frames = FrameSequence(self.width, self.height, chunked)
 
-        self.current_image_data = None
+        # layers of the current frame
+        self.layers = self.frames.current_frame
 
-        # holds older versions of [texture_data] to be restored if necessary
-        self.undo_data = []
-        self.redo_data = []
+        # the texture of the active layer, which is changed by the editing tools
+        self.texture_data = self.layers.active_layer.texture
+
+        # region (x0, y0, x1, y1) of [texture_data] which has changed since the last render, None if nothing changed
+        self.dirty = None
+
+        # holds the changes made to [texture_data] so they can be undone and redone
+        self.history = History(self.undo_length)
 
         # setup canvas and image for holding the texture display data
         self.canvas = Canvas(self)
@@ -60,23 +88,60 @@ class TextureEditor(ttk.Frame):
 
         self.canvas.grid(column=0, row=0, sticky='NSEW')
 
+        # loads the fonts used to display the texture at every zoom level
+        self.fonts = FontManager()
+
         self.font = self.__getFont(self.zoom)
 
-        self.__generateImage()
+        # caches the rendered characters of every font size
+        self.glyph_atlas = GlyphAtlas()
+
+        self.zoom_job = None
+
+        # cells hit by pen strokes since the last frame as (xs, ys, erase) segments, and the latest box of a box stroke
+        self.stroke_hits = []
+        # cell of the previous pen event, the next event draws a line starting there
+        self.stroke_last = None
+        self.stroke_box = None
+        self.stroke_job = None
+
+        # first corner and region of the box which is dragged in box mode, and the canvas item previewing it
+        self.box_begin = None
+        self.box_region = None
+        self.box_preview = None
+
+        # region of the selected cells in select mode and the canvas item outlining it
+        self.selection = None
+        self.selection_item = None
+        self.stroke_select = None
 
-        self.__drawData()
+        # cells dragged in select mode, the position of their upper left corner,
+        # the cell of the block which is held and the cells covered by the block, see __moveFloating
+        self.floating = None
+        self.float_pos = None
+        self.float_grab = None
+        self.float_under = None
 
-        self.img = ImageTk.PhotoImage(self.texture)
+        # cells copied from a selection
+        self.clipboard = None
 
-        self.img_id = self.canvas.create_image(0, 0, image=self.img, anchor='nw')
+        # displays the part of the texture which is visible on the canvas
+        self.renderer = TileRenderer(self.canvas, self.glyph_atlas, self.layers, self.font,
+                                     self.__backgroundColor())
 
-        self.__drawImage()
+        # whether the previous and the next frame are drawn over the current frame, and the renderers drawing them
+        self.onion_skin = (False, False)
+        self.onion_renderers = []
+
+        self.__generateImage()
 
         # setup canvas event bindings
 
         self.bind_all('<Control-z>', lambda e: self.undo())
         self.bind_all('<Control-y>', lambda e: self.redo())
 
+        self.canvas.bind('<Configure>', self.__configure)
+
         self.canvas.bind('<B2-Motion>', self.__move)
         self.canvas.bind('<2>', self.__moveStart)
         self.canvas.bind('<ButtonRelease-2>', self.__moveEnd)
@@ -89,6 +154,10 @@ class TextureEditor(ttk.Frame):
         self.canvas.bind('<ButtonRelease-1>', self.__drawEnd)
         self.canvas.bind('<Alt-1>', self.__copy)
 
+        self.canvas.bind('<Control-c>', lambda e: self.copySelection())
+        self.canvas.bind('<Control-x>', lambda e: self.cutSelection())
+        self.canvas.bind('<Control-v>', lambda e: self.paste())
+
         self.canvas.bind('<B3-Motion>', self.__erase)
         self.canvas.bind('<ButtonPress-3>', self.__eraseStart)
         self.canvas.bind('<ButtonRelease-3>', self.__eraseEnd)
@@ -98,36 +167,16 @@ class TextureEditor(ttk.Frame):
         self.copying = False
 
     def undo(self):
-        if self.undo_data:
-            self.redo_data.append(deepcopy(self.texture_data))
-            self.texture_data = self.undo_data.pop(-1)
-            print('undo', len(self.undo_data))
-            # check if the previous data had a different size
-            if self.width != len(self.texture_data[0]) or self.height != len(self.texture_data):
-                self.width = len(self.texture_data[0])
-                self.height = len(self.texture_data)
-
-                # image size changed so a new image must be generated
-                self.__generateImage()
-                self.img = ImageTk.PhotoImage(self.texture)
+        patches = self.history.undo()
 
-            self.rerender()
+        if patches:
+            self.__historyChanged(patches)
 
     def redo(self):
-        if self.redo_data:
-            self.undo_data.append(self.texture_data)
-            self.texture_data = self.redo_data.pop(-1)
+        patches = self.history.redo()
 
-            # check if the previous data had a different size
-            if self.width != len(self.texture_data[0]) or self.height != len(self.texture_data):
-                self.width = len(self.texture_data[0])
-                self.height = len(self.texture_data)
-
-                # image size changed so a new image must be generated
-                self.__generateImage()
-                self.img = ImageTk.PhotoImage(self.texture)
-
-            self.rerender()
+        if patches:
+            self.__historyChanged(patches)
 
     def resize(self, width, height):
         """
@@ -137,30 +186,70 @@ class TextureEditor(ttk.Frame):
         """
 
         if self.width != width or self.height != height:
+            self.__setSelection(None)
 
-            self.undo_data.append(deepcopy(self.texture_data))
+            # every layer of every frame is resized as a single edit
+            self.history.begin()
 
-            if height > self.height:
-                self.texture_data.extend([] for _ in range(height - len(self.texture_data)))
-            elif height < self.height:
-                del self.texture_data[height:]
+            for layer in self.__allLayers():
+                self.history.resize(layer.texture, width, height)
 
-            for row in self.texture_data:
-                if width > len(row):
-                    row.extend([PaletteData() for _ in range(width - len(row))])
-                elif width < len(row):
-                    del row[width:]
+            self.history.commit()
 
             self.width = width
             self.height = height
 
             # image size changed so a new image must be generated
             self.__generateImage()
-            self.img = ImageTk.PhotoImage(self.texture)
 
+    def load(self, texture):
+        """
+        replaces the cells of the active layer with the cells of the TextureData or ChunkedTextureData [texture],
+        this can be undone as a single edit. the other layers and frames are resized to the size of [texture].
+        """
 
+        self.__setSelection(None)
 
-            self.rerender()
+        self.history.begin()
+
+        if self.texture_data.width != texture.width or self.texture_data.height != texture.height:
+            for layer in self.__allLayers():
+                self.history.resize(layer.texture, texture.width, texture.height)
+
+        self.history.record(self.texture_data, 0, 0, texture.width, texture.height)
+
+        # only the chunks of chunked textures which hold cells are copied
+        if isinstance(texture, ChunkedTextureData):
+            self.texture_data.erase(0, 0, texture.width, texture.height)
+
+            for (cx, cy), chunk in texture.populatedChunks():
+                x, y = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+                self.texture_data.setRegion(x, y, chunk.cells[:texture.height - y, :texture.width - x])
+        else:
+            self.texture_data.setRegion(0, 0, texture.region(0, 0, texture.width, texture.height))
+
+        self.history.commit()
+
+        self.__invalidate(0, 0, texture.width, texture.height)
+        self.__historyChanged()
+
+    def setFontName(self, name):
+        """displays the texture with the bundled font [name], see FontManager.FONTS"""
+
+        self.__finishZoom()
+
+        if name == self.fonts.name:
+            return
+
+        self.fonts.name = name
+
+        # masks of the previous font are not used anymore
+        self.glyph_atlas.clear()
+
+        self.font = self.__getFont(self.zoom)
+
+        for renderer in self.__renderers():
+            renderer.setFont(self.font)
 
     def drawText(self, text):
         """draws [text] onto the texture"""
@@ -175,14 +264,126 @@ class TextureEditor(ttk.Frame):
             y += 1
 
     def drawChar(self, pos, char, foreground, background):
-        """draws [char] with the color of [foregound] onto the texture using ImageDraw. A box with the color of [background] is drawn around the character"""
+        """draws [char] with the color of [foregound] onto the displayed texture using the glyph atlas. A box with the color of [background] is drawn around the character"""
+
+        mask = self.glyph_atlas.mask(self.font, ord(char))
+
+        cell = blend(mask, foreground if foreground is not None else DEFAULT_FOREGROUND, background)
+
+        self.renderer.drawCell(pos[0], pos[1], cell)
+
+    def addFrame(self, copy=True):
+        """adds a frame after the current frame and shows it, a copy of the current frame if [copy] is set"""
+
+        self.frames.addFrame(copy)
+        self.__frameChanged()
+
+    def removeFrame(self):
+        """removes the current frame, the last frame can not be removed"""
+
+        if self.frames.removeFrame() is not None:
+            self.__frameChanged()
+
+    def setFrame(self, index):
+        """shows and edits the frame at [index]"""
+
+        if index != self.frames.current and self.frames.frame(index) is not None:
+            self.frames.current = index
+            self.__frameChanged()
+
+    def setOnionSkin(self, previous, following):
+        """draws the previous frame if [previous] is set and the next frame if [following] is set over the current frame"""
+
+        self.onion_skin = (previous, following)
+        self.__updateOnionSkin()
+
+    def setFillMatch(self, character=True, foreground=True, background=True):
+        """sets which values a cell must share with the clicked cell to be filled by the fill tool"""
+
+        self.fill_match = (CHARACTER if character else 0) | (FOREGROUND if foreground else 0) | \
+                          (BACKGROUND if background else 0)
+
+    def copySelection(self):
+        """copies the selected cells to the clipboard"""
+
+        if self.selection is not None:
+            self.clipboard = self.texture_data.region(*self.selection)
+
+    def cutSelection(self):
+        """copies the selected cells to the clipboard and erases them as a single edit"""
+
+        if self.selection is None or self.layers.active_layer.locked:
+            return
+
+        self.copySelection()
+
+        self.history.begin()
+        self.history.record(self.texture_data, *self.selection)
+        self.texture_data.erase(*self.selection)
+        self.history.commit()
+
+        self.__invalidate(*self.selection)
+        self.rerender()
+
+    def paste(self):
+        """writes the clipboard at the upper left corner of the selection, or of the texture, and selects it"""
+
+        if self.clipboard is None or self.layers.active_layer.locked:
+            return
+
+        x, y = self.selection[:2] if self.selection is not None else (0, 0)
+
+        self.history.begin()
+        region = self.__writeBlock(x, y, self.clipboard)
+        self.history.commit()
+
+        self.__setSelection(region)
+        self.rerender()
+
+    def flipSelection(self, horizontal=True):
+        """mirrors the selected cells from left to right if [horizontal] is set, otherwise from top to bottom"""
+
+        self.__transformSelection(lambda cells: np.flip(cells, axis=1 if horizontal else 0))
+
+    def rotateSelection(self, clockwise=True):
+        """rotates the selected cells by 90 degrees around their upper left corner"""
+
+        self.__transformSelection(lambda cells: np.rot90(cells, -1 if clockwise else 1))
+
+    def addLayer(self):
+        """adds an empty layer above the active layer and makes it the active layer"""
+
+        self.layers.addLayer()
+        self.texture_data = self.layers.active_layer.texture
+
+    def removeLayer(self):
+        """removes the active layer, the last layer can not be removed"""
+
+        if self.layers.removeLayer() is not None:
+            self.__layersChanged()
+
+    def moveLayer(self, step):
+        """moves the active layer up by [step] layers, or down if [step] is negative"""
+
+        self.layers.moveLayer(self.layers.active, step)
+        self.__layersChanged()
+
+    def setActiveLayer(self, index):
+        """makes the layer at [index] the one which is changed by the editing tools"""
+
+        self.layers.active = index
+        self.texture_data = self.layers.active_layer.texture
 
-        char_width, char_height = self.__charDimensions()
+    def setLayerVisible(self, visible):
+        """shows or hides the active layer"""
 
-        self.draw.rectangle((pos[0] * char_width + 1, pos[1] * char_height + 1,
-                             (pos[0] + 1) * char_width - 1, (pos[1] + 1) * char_height - 1), fill=background)
+        self.layers.setVisible(self.layers.active, visible)
+        self.__layersChanged()
 
-        self.draw.text((pos[0] * char_width, pos[1] * char_height), char, font=self.font, fill=foreground)
+    def setLayerLocked(self, locked):
+        """locks the active layer, locked layers can not be changed by the editing tools"""
+
+        self.layers.active_layer.locked = locked
 
     def onCopy(self, func):
         """
@@ -193,34 +394,154 @@ class TextureEditor(ttk.Frame):
         self.copy_callback = func
 
     def rerender(self):
-        self.__drawData()
-        self.__drawImage()
+        """draws the cells inside the dirty region and updates the corresponding part of the displayed image"""
 
-    def __getFont(self, size):
-        self.zoom = size
-        return ImageFont.truetype('./Resources/consola.ttf', size, encoding='utf-8')
+        # the displayed image is a zoom preview, which is replaced by a full render anyway
+        self.__finishZoom()
+
+        if self.dirty is None:
+            return
+
+        region = self.dirty
+        self.dirty = None
+
+        self.layers.invalidate(*region)
+        self.renderer.invalidate(*region)
+
+    def __historyChanged(self, patches=()):
+        for patch in patches:
+            if patch.bounds() is None:
+                continue
+
+            if self.layers.hasTexture(patch.texture):
+                self.__invalidate(*patch.bounds())
 
-    def __charDimensions(self):
-        ascent, descent = self.font.getmetrics()
-        char_width = self.font.getsize(' ')[0]
-        char_height = ascent + descent
+            # edits made before switching frames change the flattened tiles of other frames
+            for frame in self.frames.frames:
+                if frame is not self.layers and frame.hasTexture(patch.texture):
+                    frame.invalidate(*patch.bounds())
+
+            for renderer in self.onion_renderers:
+                if renderer.texture.hasTexture(patch.texture):
+                    renderer.invalidate(*patch.bounds())
+
+        # check if the restored data had a different size
+        sizes = {(layer.texture.width, layer.texture.height) for layer in self.__allLayers()} - {(self.width, self.height)}
+
+        if sizes:
+            self.width, self.height = sizes.pop()
+
+            # layers added after a resize were not part of it, so they are brought to the restored size
+            for layer in self.__allLayers():
+                if layer.texture.width != self.width or layer.texture.height != self.height:
+                    layer.texture.resize(self.width, self.height)
+
+            # image size changed so a new image must be generated
+            self.__generateImage()
+        else:
+            self.rerender()
 
-        return char_width, char_height
+    def __allLayers(self):
+        """returns the layers of every frame"""
+
+        return [layer for frame in self.frames.frames for layer in frame.layers]
+
+    def __renderers(self):
+        """returns the renderer of the current frame followed by the renderers of the onion skin"""
+
+        return [self.renderer] + self.onion_renderers
+
+    def __frameChanged(self):
+        """shows the current frame after frames were added, removed or switched"""
+
+        self.__finishZoom()
+
+        self.layers = self.frames.current_frame
+        self.texture_data = self.layers.active_layer.texture
+
+        self.renderer.texture = self.layers
+
+        self.__generateImage()
+
+    def __updateOnionSkin(self):
+        """creates a translucent renderer for every neighboring frame which is drawn as onion skin"""
+
+        for renderer in self.onion_renderers:
+            self.canvas.delete(renderer.tag)
+
+        self.onion_renderers = []
+
+        for offset, shown in zip((-1, 1), self.onion_skin):
+            frame = self.frames.frame(self.frames.current + offset)
+
+            if not shown or frame is None:
+                continue
+
+            # renderers keep the rasters of their tiles, so the onion skin is only rasterized when it is created
+            renderer = TileRenderer(self.canvas, self.glyph_atlas, frame, self.font, self.__backgroundColor(),
+                                    tag=f'onion{offset}', opacity=self.ONION_OPACITY)
+            renderer.origin = list(self.renderer.origin)
+            renderer.update()
+
+            self.onion_renderers.append(renderer)
+
+        self.canvas.tag_raise(self.OVERLAY_TAG)
+
+    def __layersChanged(self):
+        """redraws the whole texture after layers were removed, reordered, shown or hidden"""
+
+        self.texture_data = self.layers.active_layer.texture
+
+        self.__invalidate(0, 0, self.width, self.height)
+        self.rerender()
+
+    def __isLocked(self):
+        """returns if the active layer is locked and the current tool would change it"""
+
+        return self.mode != Modes.SELECT and self.layers.active_layer.locked
+
+    def __invalidate(self, x0, y0, x1, y1):
+        """marks the given region as changed, so it is drawn on the next render"""
+
+        if self.dirty is not None:
+            x0, y0 = min(x0, self.dirty[0]), min(y0, self.dirty[1])
+            x1, y1 = max(x1, self.dirty[2]), max(y1, self.dirty[3])
+
+        self.dirty = (x0, y0, x1, y1)
+
+    def __boxRegion(self, event):
+        """returns the region spanned by [box_begin] and the tile under [event], limited to the texture"""
+
+        crop_width = lambda val: self.__limitValue(val, 0, self.width - 1)
+        crop_height = lambda val: self.__limitValue(val, 0, self.height - 1)
+
+        pos_x, pos_y = self.__tileCoord(event.x, event.y)
+
+        # rectangle should be drawn from top left to bottom right
+        x0, x1 = sorted((crop_width(self.box_begin[0]), crop_width(pos_x)))
+        y0, y1 = sorted((crop_height(self.box_begin[1]), crop_height(pos_y)))
+
+        return x0, y0, x1 + 1, y1 + 1
+
+    def __getFont(self, size):
+        self.zoom = size
+        return self.fonts.get(size)
 
     def __backgroundColor(self):
         # get rgb_value of frame background color and map it from 0-65536 to 0-255, also darken it to create a border
         return *[round(c_val / 65536 * 255 * 9 / 10) for c_val in self.canvas.winfo_rgb(self.canvas['background'])], 255
 
     def __generateImage(self):
-        char_width, char_height = self.__charDimensions()
+        """rasterizes the visible part of the texture again, used when the size of the texture changes"""
+
+        self.dirty = None
 
-        self.texture = Image.fromarray(
-            np.full((self.height * char_height, self.width * char_width, 4), (0xff, 0xff, 0xff, 0xff), dtype=np.uint8))
-        self.draw = ImageDraw.Draw(self.texture)
+        for frame in self.frames.frames:
+            frame.invalidateAll()
 
-        self.current_image_data = None
+        self.renderer.reset()
 
-        self.__drawData()
+        self.__updateOnionSkin()
 
     def __tileCoord(self, x, y):
         """
@@ -228,8 +549,8 @@ class TextureEditor(ttk.Frame):
         and the origin is the upper left corner of the texture image.
         """
 
-        return floor((x - self.canvas.coords(self.img_id)[0]) / self.__charDimensions()[0]), \
-               floor((y - self.canvas.coords(self.img_id)[1]) / self.__charDimensions()[1])
+        return floor((x - self.renderer.origin[0]) / self.font.cell_width), \
+               floor((y - self.renderer.origin[1]) / self.font.cell_height)
 
     def __getImageIndex(self, x, y):
         """
@@ -237,8 +558,10 @@ class TextureEditor(ttk.Frame):
         If they are not inside the image, None wil be returned
         """
 
-        if self.canvas.coords(self.img_id)[0] < x < self.canvas.coords(self.img_id)[0] + self.img.width() and \
-                self.canvas.coords(self.img_id)[1] < y < self.canvas.coords(self.img_id)[1] + self.img.height():
+        img_width, img_height = self.renderer.pixelSize()
+
+        if self.renderer.origin[0] < x < self.renderer.origin[0] + img_width and \
+                self.renderer.origin[1] < y < self.renderer.origin[1] + img_height:
             return self.__tileCoord(x, y)
 
         return None
@@ -250,43 +573,57 @@ class TextureEditor(ttk.Frame):
 
         return min(max(min_val, val), max_val)
 
-    def __drawData(self):
-        """draws [texture_data] to the [texture_img]"""
+    def __zoom(self, step, event):
+        if self.moving:
+            return
 
-        for y, row in enumerate(self.texture_data):
-            for x, col in enumerate(row):
-                if self.current_image_data is None or col != self.current_image_data[y][x]:
-                    self.drawChar((x, y),
-                                  col.character if col.character else ' ',
-                                  col.foreground_color.rgba() if col.foreground_color else None,
-                                  col.background_color.rgba() if col.background_color else self.__backgroundColor())
+        zoom = self.zoom + step if event.delta > 0 else max(1, self.zoom - step)
 
-        self.current_image_data = deepcopy(self.texture_data)
+        if zoom == self.zoom:
+            return
 
-    def __drawImage(self):
-        """creates a image from [texture_img] on the canvas"""
+        self.zoom = zoom
 
-        self.img.paste(self.texture)
+        # show a rescaled raster while scrolling, and only rasterize the texture once scrolling has stopped
+        self.__previewZoom()
 
-        self.canvas.itemconfigure(self.img_id, image=self.img)
+        if self.zoom_job is not None:
+            self.after_cancel(self.zoom_job)
 
-    def __zoom(self, step, event):
-        if not self.moving:
-            if event.delta > 0:
-                self.zoom += step
-            else:
-                self.zoom -= step
-                self.zoom = max(1, self.zoom)
+        self.zoom_job = self.after(self.ZOOM_DELAY, self.__finishZoom)
 
-            self.font = self.__getFont(self.zoom)
+    def __previewZoom(self):
+        """displays the cached rasters closest to the current zoom level, scaled to the size of the texture at that level"""
 
-        # image size changed so a new image must be generated
-        self.__generateImage()
-        self.img = ImageTk.PhotoImage(self.texture)
+        for renderer in self.__renderers():
+            renderer.preview(self.zoom)
 
-        self.rerender()
+    def __finishZoom(self):
+        """rasterizes the texture at the current zoom level, if a zoom preview is displayed"""
+
+        if self.zoom_job is None:
+            return
+
+        self.after_cancel(self.zoom_job)
+        self.zoom_job = None
+
+        self.font = self.__getFont(self.zoom)
+
+        for renderer in self.__renderers():
+            renderer.setFont(self.font)
+
+        self.__drawSelection()
+
+    def __configure(self, event):
+        # the visible area changed, so tiles may have to be rasterized or removed
+        self.__finishZoom()
+
+        for renderer in self.__renderers():
+            renderer.update()
 
     def __moveStart(self, event):
+        self.__finishZoom()
+
         self.moving = True
         self.last_move = (event.x, event.y)
 
@@ -297,27 +634,39 @@ class TextureEditor(ttk.Frame):
         delta_y = event.y - self.last_move[1]
 
         self.last_move = (event.x, event.y)
-        self.canvas.move(self.img_id, delta_x, delta_y)
+        for renderer in self.__renderers():
+            renderer.move(delta_x, delta_y)
+
+        self.canvas.move(self.OVERLAY_TAG, delta_x, delta_y)
+        self.canvas.tag_raise(self.OVERLAY_TAG)
 
     def __moveEnd(self, event):
         self.moving = False
 
     def __drawStart(self, event):
-        if self.copying:
+        if self.copying or self.__isLocked():
             return
 
-        self.redo_data = []
-
-        if not self.undo_data or self.texture_data != self.undo_data[-1]:
-            if len(self.undo_data) >= self.undo_length:
-                print('REACHED UNDO HISTORY LIMIT: ', self.undo_length)
-                self.undo_data.pop(0)
+        self.__finishZoom()
 
-            self.undo_data.append(deepcopy(self.texture_data))
+        self.history.begin()
+        self.stroke_last = None
 
         if self.mode == Modes.BOX:
             self.box_begin = self.__tileCoord(event.x, event.y)
-            self.no_box_data = deepcopy(self.texture_data)
+        elif self.mode == Modes.FILL:
+            self.__fill(event, erase=False)
+            return
+        elif self.mode == Modes.SELECT:
+            # keyboard shortcuts of the selection are bound to the canvas
+            self.canvas.focus_set()
+
+            pos = self.__tileCoord(event.x, event.y)
+
+            if self.__inSelection(*pos) and not self.layers.active_layer.locked:
+                self.__liftSelection(*pos)
+            else:
+                self.box_begin = pos
 
         self.__draw(event)
 
@@ -326,137 +675,355 @@ class TextureEditor(ttk.Frame):
             self.copying = False
             return
 
-        if self.undo_data and self.undo_data[-1] == self.texture_data:
-            self.undo_data.pop()
+        self.__flushStroke()
+        self.__commitBox(erase=False)
 
-        if self.mode == Modes.BOX:
-            del self.box_begin
-            del self.no_box_data
+        # the dragged cells stay where they were dropped
+        self.floating = None
+        self.float_under = None
+
+        self.history.commit()
 
     def __draw(self, event):
+        if self.copying or self.__isLocked():
+            return
+
+        self.__queueStroke(event, erase=False)
+
+    def __eraseStart(self, event):
+        if self.copying or self.__isLocked():
+            return
+
+        self.__finishZoom()
+
+        self.history.begin()
+        self.stroke_last = None
+
+        if self.mode == Modes.BOX:
+            self.box_begin = self.__tileCoord(event.x, event.y)
+        elif self.mode == Modes.FILL:
+            self.__fill(event, erase=True)
+            return
+        elif self.mode == Modes.SELECT:
+            self.__setSelection(None)
+            return
+
+        self.__erase(event)
+
+    def __eraseEnd(self, event):
         if self.copying:
+            self.copying = False
+            return
+
+        self.__flushStroke()
+        self.__commitBox(erase=True)
+        self.history.commit()
+
+    def __erase(self, event):
+        if self.copying or self.__isLocked():
             return
 
+        self.__queueStroke(event, erase=True)
+
+    def __queueStroke(self, event, erase):
+        """stores the cell or box hit by [event], the texture is only updated once per frame by __flushStroke"""
+
         if self.mode == Modes.PEN:
-            indices = self.__getImageIndex(event.x, event.y)
+            pos = self.__tileCoord(event.x, event.y)
+
+            # fast strokes skip cells between two events, so the cells in between are filled with a line
+            start = pos if self.stroke_last is None else self.stroke_last
+            self.stroke_last = pos
+
+            xs, ys = lineCells(*start, *pos)
+
+            inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+
+            if not inside.any():
+                return
+
+            self.stroke_hits.append((xs[inside], ys[inside], erase))
+
+        elif self.mode == Modes.BOX and self.box_begin is not None:
+            # every box replaces the previous one, so only the latest one has to be drawn
+            self.stroke_box = (self.__boxRegion(event), erase)
 
-            if indices:
-                pos_x, pos_y = indices
+        elif self.mode == Modes.SELECT and (self.floating is not None or self.box_begin is not None):
+            # only the latest pointer position is used to move or span the selection
+            self.stroke_select = event
 
-                if self.draw_data.character:
-                    self.texture_data[pos_y][pos_x].character = self.draw_data.character
+        else:
+            return
+
+        if self.stroke_job is None:
+            self.stroke_job = self.after(self.FRAME_DELAY, self.__flushStroke)
+
+    def __flushStroke(self):
+        """applies every queued stroke hit to the texture in one batch and redraws the changed cells"""
+
+        if self.stroke_job is not None:
+            self.after_cancel(self.stroke_job)
+            self.stroke_job = None
 
-                if self.draw_data.foreground_color:
-                    self.texture_data[pos_y][pos_x].foreground_color = self.draw_data.foreground_color
+        self.__finishZoom()
 
-                if self.draw_data.background_color:
-                    self.texture_data[pos_y][pos_x].background_color = self.draw_data.background_color
+        hits, self.stroke_hits = self.stroke_hits, []
 
-                self.rerender()
+        # consecutive hits of the same action are applied together, so drawing and erasing keep their order
+        for erase, group in groupby(hits, key=lambda hit: hit[2]):
+            segments = list(group)
 
-        elif self.mode == Modes.BOX:
+            xs = np.concatenate([segment[0] for segment in segments])
+            ys = np.concatenate([segment[1] for segment in segments])
+
+            # cells hit several times are only written once
+            ys, xs = np.divmod(np.unique(ys * self.width + xs), self.width)
+
+            self.history.recordIndices(self.texture_data, ys, xs)
+
+            if erase:
+                cells = np.zeros(len(ys), dtype=CELL_DTYPE)
+            else:
+                cells = self.texture_data.gather(ys, xs)
+                paintCells(cells, packCell(self.draw_data))
 
-            crop_width = lambda val: self.__limitValue(val, 0, self.width - 1)
-            crop_height = lambda val: self.__limitValue(val, 0, self.height - 1)
+            self.texture_data.scatter(ys, xs, cells)
 
-            pos_x, pos_y = self.__tileCoord(event.x, event.y)
+            self.__redrawCells(ys, xs)
 
-            diff_x = abs(crop_width(self.box_begin[0]) - crop_width(pos_x))
-            diff_y = abs(crop_height(self.box_begin[1]) - crop_height(pos_y))
+        if self.stroke_box is not None:
+            self.box_region, erase = self.stroke_box
+            self.stroke_box = None
 
-            # rectangle should be drawn from top left to bottom right
-            offset_x = min(crop_width(self.box_begin[0]), crop_width(pos_x))
-            offset_y = min(crop_height(self.box_begin[1]), crop_height(pos_y))
+            self.__drawBoxPreview(erase)
 
-            self.texture_data = deepcopy(self.no_box_data)
+        if self.stroke_select is not None:
+            event = self.stroke_select
+            self.stroke_select = None
 
-            for x in range(diff_x + 1):
-                for y in range(diff_y + 1):
-                    if self.draw_data.character:
-                        self.texture_data[y + offset_y][x + offset_x].character = self.draw_data.character
+            if self.floating is not None:
+                pos_x, pos_y = self.__tileCoord(event.x, event.y)
+                self.__moveFloating(pos_x - self.float_grab[0], pos_y - self.float_grab[1])
+            elif self.box_begin is not None:
+                self.__setSelection(self.__boxRegion(event))
 
-                    if self.draw_data.foreground_color:
-                        self.texture_data[y + offset_y][x + offset_x].foreground_color = self.draw_data.foreground_color
+    def __drawBoxPreview(self, erase):
+        """shows [box_region] as a rectangle on top of the texture, the cells are only changed once the box is released"""
 
-                    if self.draw_data.background_color:
-                        self.texture_data[y + offset_y][x + offset_x].background_color = self.draw_data.background_color
+        coords = self.__canvasRect(*self.box_region)
+
+        if self.box_preview is None:
+            if erase:
+                options = {'outline': '#ff0000', 'dash': (4, 2)}
+            else:
+                foreground, background = self.draw_data.foreground_color, self.draw_data.background_color
+
+                options = {'outline': foreground.rgbHex() if foreground else '#000000',
+                           'fill': background.rgbHex() if background else ''}
+
+            self.box_preview = self.canvas.create_rectangle(*coords, tags=self.OVERLAY_TAG, **options)
+        else:
+            self.canvas.coords(self.box_preview, *coords)
+
+        # tiles rasterized after the preview was created would cover it
+        self.canvas.tag_raise(self.box_preview)
+
+    def __canvasRect(self, x0, y0, x1, y1):
+        """returns the canvas coordinates of the rectangle covering the cells of the given region"""
+
+        origin_x, origin_y = self.renderer.origin
+        cell_width, cell_height = self.font.cell_width, self.font.cell_height
+
+        return (origin_x + x0 * cell_width, origin_y + y0 * cell_height,
+                origin_x + x1 * cell_width - 1, origin_y + y1 * cell_height - 1)
+
+    def __commitBox(self, erase):
+        """removes the box preview and writes the box to the texture as a single change"""
+
+        if self.box_preview is not None:
+            self.canvas.delete(self.box_preview)
+            self.box_preview = None
+
+        if self.box_region is not None:
+            self.history.record(self.texture_data, *self.box_region)
+
+            if erase:
+                self.texture_data.erase(*self.box_region)
+            else:
+                self.texture_data.paint(*self.box_region, self.draw_data)
+
+            self.__invalidate(*self.box_region)
 
             self.rerender()
 
-    def __eraseStart(self, event):
-        if self.copying:
+        self.box_begin = None
+        self.box_region = None
+
+    def __fill(self, event, erase):
+        """fills or erases the area of matching cells around the cell under [event] as a single change"""
+
+        indices = self.__getImageIndex(event.x, event.y)
+
+        if indices is None:
             return
 
-        self.redo_data = []
+        ys, xs = floodFill(self.texture_data, *indices, self.fill_match)
 
-        if self.texture_data != self.undo_data[-1]:
-            if len(self.undo_data) >= self.undo_length:
-                self.undo_data.pop(0)
+        if len(ys) == 0:
+            return
 
-            self.undo_data.append(deepcopy(self.texture_data))
+        self.history.recordIndices(self.texture_data, ys, xs)
 
-        if self.mode == Modes.BOX:
-            self.box_begin = self.__tileCoord(event.x, event.y)
-            self.no_box_data = deepcopy(self.texture_data)
+        if erase:
+            cells = np.zeros(len(ys), dtype=CELL_DTYPE)
+        else:
+            cells = self.texture_data.gather(ys, xs)
+            paintCells(cells, packCell(self.draw_data))
 
-        self.__erase(event)
+        self.texture_data.scatter(ys, xs, cells)
+
+        self.__invalidate(xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+
+        self.rerender()
+
+    def __setSelection(self, region):
+        """selects the cells of [region], None removes the selection"""
+
+        self.selection = region
+        self.__drawSelection()
+
+    def __drawSelection(self):
+        """outlines the selection on top of the texture"""
+
+        if self.selection is None:
+            if self.selection_item is not None:
+                self.canvas.delete(self.selection_item)
+                self.selection_item = None
 
-    def __eraseEnd(self, event):
-        if self.copying:
-            self.copying = False
             return
 
-        if self.undo_data[-1] == self.texture_data:
-            self.undo_data.pop()
+        coords = self.__canvasRect(*self.selection)
 
-        if self.mode == Modes.BOX:
-            del self.box_begin
-            del self.no_box_data
+        if self.selection_item is None:
+            self.selection_item = self.canvas.create_rectangle(*coords, outline='#000000', dash=(4, 4),
+                                                               tags=self.OVERLAY_TAG)
+        else:
+            self.canvas.coords(self.selection_item, *coords)
 
-    def __erase(self, event):
-        if self.copying:
+        self.canvas.tag_raise(self.selection_item)
+
+    def __inSelection(self, x, y):
+        return self.selection is not None and \
+               self.selection[0] <= x < self.selection[2] and self.selection[1] <= y < self.selection[3]
+
+    def __liftSelection(self, x, y):
+        """starts dragging the selected cells, held at the cell [x], [y]"""
+
+        x0, y0, x1, y1 = self.selection
+
+        self.floating = self.texture_data.region(*self.selection)
+        self.float_pos = (x0, y0)
+        self.float_grab = (x - x0, y - y0)
+
+        # the cells are only erased from their old position once they are moved
+        self.float_under = (x0, y0, np.zeros(self.floating.shape, dtype=CELL_DTYPE))
+
+    def __moveFloating(self, x, y):
+        """moves the dragged cells to the upper left corner [x], [y], restoring the cells they covered before"""
+
+        if (x, y) == self.float_pos:
             return
 
-        if self.mode == Modes.PEN:
+        if self.float_under is not None:
+            self.__writeBlock(*self.float_under)
+
+        region = self.__clipRegion(x, y, x + self.floating.shape[1], y + self.floating.shape[0])
 
-            indices = self.__getImageIndex(event.x, event.y)
+        if region is not None:
+            self.float_under = (region[0], region[1], self.texture_data.region(*region))
+            self.__writeBlock(x, y, self.floating)
+        else:
+            self.float_under = None
 
-            if indices:
-                pos_x, pos_y = indices
+        self.float_pos = (x, y)
 
-                self.texture_data[pos_y][pos_x] = PaletteData()
+        self.__setSelection(region)
+        self.rerender()
 
-                self.rerender()
+    def __clipRegion(self, x0, y0, x1, y1):
+        """returns the part of the given region inside the texture, or None if it is outside"""
 
-        elif self.mode == Modes.BOX:
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
 
-            crop_width = lambda val: self.__limitValue(val, 0, self.width - 1)
-            crop_height = lambda val: self.__limitValue(val, 0, self.height - 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
 
-            pos_x, pos_y = self.__tileCoord(event.x, event.y)
+        return x0, y0, x1, y1
 
-            diff_x = abs(crop_width(self.box_begin[0]) - crop_width(pos_x))
-            diff_y = abs(crop_height(self.box_begin[1]) - crop_height(pos_y))
+    def __writeBlock(self, x, y, cells):
+        """
+        writes the 2d array [cells] with its upper left corner at [x], [y] and records it in the history.
+        cells outside the texture are cut off, returns the region which was written or None.
+        """
 
-            offset_x = min(crop_width(self.box_begin[0]), crop_width(pos_x))
-            offset_y = min(crop_height(self.box_begin[1]), crop_height(pos_y))
+        region = self.__clipRegion(x, y, x + cells.shape[1], y + cells.shape[0])
 
-            self.texture_data = deepcopy(self.no_box_data)
+        if region is None:
+            return None
 
-            for x in range(diff_x + 1):
-                for y in range(diff_y + 1):
-                    self.texture_data[y + offset_y][x + offset_x] = PaletteData()
+        x0, y0, x1, y1 = region
 
-            self.rerender()
+        self.history.record(self.texture_data, *region)
+        self.texture_data.setRegion(x0, y0, cells[y0 - y:y1 - y, x0 - x:x1 - x])
+        self.__invalidate(*region)
+
+        return region
+
+    def __transformSelection(self, transform):
+        """replaces the selected cells by [transform] applied to them, keeping the upper left corner as a single edit"""
+
+        if self.selection is None or self.layers.active_layer.locked:
+            return
+
+        cells = np.ascontiguousarray(transform(self.texture_data.region(*self.selection)))
+
+        self.history.begin()
+
+        self.history.record(self.texture_data, *self.selection)
+        self.texture_data.erase(*self.selection)
+        self.__invalidate(*self.selection)
+
+        region = self.__writeBlock(*self.selection[:2], cells)
+
+        self.history.commit()
+
+        self.__setSelection(region)
+        self.rerender()
+
+    def __redrawCells(self, ys, xs):
+        """redraws the cells at the index arrays [ys], [xs] with a single update of every tile they are in"""
+
+        tile_size = self.renderer.TILE_SIZE
+        tiles = (ys // tile_size) * (self.width // tile_size + 1) + xs // tile_size
+
+        for tile in np.unique(tiles):
+            in_tile = tiles == tile
+
+            self.layers.invalidate(xs[in_tile].min(), ys[in_tile].min(), xs[in_tile].max() + 1, ys[in_tile].max() + 1)
+            self.renderer.invalidate(xs[in_tile].min(), ys[in_tile].min(),
+                                     xs[in_tile].max() + 1, ys[in_tile].max() + 1)
 
     def __copy(self, event):
         self.copying = True
 
+        self.__finishZoom()
+
         indices = self.__getImageIndex(event.x, event.y)
         if self.copy_callback and indices:
             pos_x, pos_y = indices
 
-            self.copy_callback(self.texture_data[pos_y][pos_x])
+            self.copy_callback(self.layers.get(pos_x, pos_y))
 
             return 'break'
 
@@ -0,0 +1,290 @@
+from collections import OrderedDict
+from math import ceil, floor
+
+from PIL import Image, ImageTk
+
+from src.core.GlyphAtlas import cellSize
+from src.core.Rasterizer import rasterize
+from src.RasterPyramid import RasterPyramid
+from src.core.ChunkedTextureData import ChunkedTextureData, CHUNK_SIZE
+from src.core.LayerStack import LayerStack
+
+
+class Tile:
+    """a block of rasterized cells displayed as a single image on the canvas"""
+
+    __slots__ = ('pyramid', 'raster', 'photo', 'item')
+
+    def __init__(self):
+        # rasters of this tile at recently used font sizes
+        self.pyramid = RasterPyramid()
+
+        self.raster = None
+        self.photo = None
+        self.item = None
+
+
+class TileRenderer:
+    """
+    displays a texture on a canvas as a grid of tiles of TILE_SIZE x TILE_SIZE cells.
+    only tiles covering the visible part of the canvas are rasterized, so memory is bounded by the canvas size.
+    [texture] must provide a width, a height and a region(x0, y0, x1, y1) method returning an array of cells.
+    if [texture] is a ChunkedTextureData, or a LayerStack showing a single chunked layer, tiles line up with its chunks
+    and rasters are cached in the chunks, while empty chunks share a single raster.
+    the tile images are tagged with [tag] and drawn with [opacity], opaque tiles are kept below every other
+    canvas item, so translucent tiles and overlays drawn by other renderers stay visible.
+    """
+
+    TILE_SIZE = CHUNK_SIZE
+
+    # maximum number of chunks holding a cached raster
+    CHUNK_RASTER_CACHE = 64
+
+    # default canvas tag of every tile image
+    TAG = 'texture'
+
+    def __init__(self, canvas, atlas, texture, font, background, tag=TAG, opacity=1.0):
+        self.canvas = canvas
+        self.atlas = atlas
+        self.texture = texture
+        self.font = font
+        self.background = background
+
+        self.tag = tag
+        self.opacity = opacity
+
+        # size in pixels of a single cell drawn with [font]
+        self.char_width, self.char_height = cellSize(font)
+
+        # canvas coordinates of the upper left corner of the texture
+        self.origin = [0, 0]
+
+        # maps (tile_x, tile_y) to the displayed Tile objects
+        self.tiles = {}
+
+        # chunks which currently hold a cached raster, in the order they were last rasterized
+        self.cached_chunks = OrderedDict()
+
+        # maps (font file, font size, width, height) to the raster of an empty tile of that size
+        self.empty_rasters = {}
+
+    def cellSize(self):
+        return self.char_width, self.char_height
+
+    def pixelSize(self):
+        """returns the width and height in pixels of the whole texture"""
+
+        char_width, char_height = self.cellSize()
+
+        return self.texture.width * char_width, self.texture.height * char_height
+
+    def visibleTiles(self):
+        """returns the range of tiles (tx0, ty0, tx1, ty1) covering the visible part of the canvas"""
+
+        char_width, char_height = self.cellSize()
+        tile_width, tile_height = self.TILE_SIZE * char_width, self.TILE_SIZE * char_height
+
+        tile_count_x = ceil(self.texture.width / self.TILE_SIZE)
+        tile_count_y = ceil(self.texture.height / self.TILE_SIZE)
+
+        return max(0, floor(-self.origin[0] / tile_width)), \
+               max(0, floor(-self.origin[1] / tile_height)), \
+               min(tile_count_x, ceil((self.canvas.winfo_width() - self.origin[0]) / tile_width)), \
+               min(tile_count_y, ceil((self.canvas.winfo_height() - self.origin[1]) / tile_height))
+
+    def update(self):
+        """rasterizes tiles which have become visible and removes tiles which are no longer close to the visible area"""
+
+        tx0, ty0, tx1, ty1 = self.visibleTiles()
+
+        # tiles right next to the visible area are kept, so panning back and forth does not rasterize them again
+        for key in list(self.tiles):
+            if not (tx0 - 1 <= key[0] <= tx1 and ty0 - 1 <= key[1] <= ty1):
+                self.__removeTile(key)
+
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                if (tx, ty) not in self.tiles:
+                    self.__createTile(tx, ty)
+
+    def invalidate(self, x0, y0, x1, y1):
+        """rasterizes the cells of the given region again in every displayed tile"""
+
+        for (tx, ty), tile in self.tiles.items():
+            bx0, by0, bx1, by1 = self.__tileBounds(tx, ty)
+
+            ix0, iy0 = max(x0, bx0), max(y0, by0)
+            ix1, iy1 = min(x1, bx1), min(y1, by1)
+
+            if ix0 >= ix1 or iy0 >= iy1:
+                continue
+
+            pixels = rasterize(self.texture.region(ix0, iy0, ix1, iy1), self.font, self.atlas, self.background)
+
+            self.__blit(tile, ix0 - bx0, iy0 - by0, pixels)
+
+            # rasters at other font sizes no longer match the texture
+            tile.pyramid.retain(self.font.size)
+
+    def drawCell(self, x, y, pixels):
+        """draws the rgba array [pixels] over the cell at [x], [y], if it is displayed"""
+
+        tile = self.tiles.get((x // self.TILE_SIZE, y // self.TILE_SIZE))
+
+        if tile is not None:
+            self.__blit(tile, x % self.TILE_SIZE, y % self.TILE_SIZE, pixels)
+
+    def move(self, delta_x, delta_y):
+        self.origin[0] += delta_x
+        self.origin[1] += delta_y
+
+        self.canvas.move(self.tag, delta_x, delta_y)
+
+        self.update()
+
+    def setFont(self, font):
+        """displays the texture with [font], reusing rasters of tiles which have been rendered at its size before"""
+
+        # cached rasters were drawn with a different typeface, so none of them can be reused
+        if font.path != self.font.path:
+            for tile in self.tiles.values():
+                tile.pyramid.clear()
+
+            self.empty_rasters.clear()
+
+        self.font = font
+        self.char_width, self.char_height = cellSize(font)
+
+        for key, tile in self.tiles.items():
+            raster = tile.pyramid.get(font.size)
+
+            if raster is None:
+                raster = self.__rasterizeTile(*key)
+                tile.pyramid.store(font.size, raster)
+
+            self.__showRaster(key, tile, raster)
+
+        self.update()
+
+    def preview(self, size):
+        """displays the tiles rescaled to font size [size] without rasterizing them"""
+
+        scale = size / self.font.size
+
+        for (tx, ty), tile in self.tiles.items():
+            char_width, char_height = self.cellSize()
+
+            dimensions = (max(1, round(tile.raster.width * scale)), max(1, round(tile.raster.height * scale)))
+
+            tile.photo = self.__photo(tile.pyramid.scaled(size, dimensions))
+
+            self.canvas.itemconfigure(tile.item, image=tile.photo)
+            self.canvas.coords(tile.item,
+                               self.origin[0] + round(tx * self.TILE_SIZE * char_width * scale),
+                               self.origin[1] + round(ty * self.TILE_SIZE * char_height * scale))
+
+    def reset(self):
+        """removes every tile and rasterizes the visible ones again, used when the size of the texture changes"""
+
+        for key in list(self.tiles):
+            self.__removeTile(key)
+
+        self.update()
+
+    def __tileBounds(self, tx, ty):
+        """returns the region (x0, y0, x1, y1) of cells covered by the tile at [tx], [ty]"""
+
+        x0, y0 = tx * self.TILE_SIZE, ty * self.TILE_SIZE
+
+        return x0, y0, min(x0 + self.TILE_SIZE, self.texture.width), min(y0 + self.TILE_SIZE, self.texture.height)
+
+    def __rasterizeTile(self, tx, ty):
+        bounds = self.__tileBounds(tx, ty)
+
+        texture = self.texture.visibleTexture() if isinstance(self.texture, LayerStack) else self.texture
+
+        if not isinstance(texture, ChunkedTextureData):
+            return self.__rasterize(bounds)
+
+        key = (self.font.path, self.font.size, bounds[2] - bounds[0], bounds[3] - bounds[1])
+        chunk = texture.chunkAt(tx, ty)
+
+        # empty tiles all look the same, the shared raster is copied as the tile raster is drawn to on edits
+        if chunk is None:
+            if key not in self.empty_rasters:
+                self.empty_rasters[key] = self.__rasterize(bounds)
+
+            return self.empty_rasters[key].copy()
+
+        if chunk.dirty or chunk.raster is None or chunk.raster[0] != key:
+            chunk.raster = (key, self.__rasterize(bounds))
+            chunk.dirty = False
+
+        # chunks shared between frames may have been rasterized by another renderer, which tracks them separately
+        self.cached_chunks[id(chunk)] = chunk
+        self.cached_chunks.move_to_end(id(chunk))
+
+        if len(self.cached_chunks) > self.CHUNK_RASTER_CACHE:
+            self.cached_chunks.popitem(last=False)[1].raster = None
+
+        # chunks shared between frames are displayed by several renderers, which each draw edits to their own copy
+        return chunk.raster[1].copy()
+
+    def __rasterize(self, bounds):
+        return Image.fromarray(rasterize(self.texture.region(*bounds), self.font, self.atlas, self.background))
+
+    def __createTile(self, tx, ty):
+        tile = Tile()
+
+        raster = self.__rasterizeTile(tx, ty)
+        tile.pyramid.store(self.font.size, raster)
+
+        self.tiles[(tx, ty)] = tile
+
+        self.__showRaster((tx, ty), tile, raster)
+
+    def __showRaster(self, key, tile, raster):
+        char_width, char_height = self.cellSize()
+
+        x = self.origin[0] + key[0] * self.TILE_SIZE * char_width
+        y = self.origin[1] + key[1] * self.TILE_SIZE * char_height
+
+        tile.raster = raster
+        tile.photo = self.__photo(raster)
+
+        if tile.item is None:
+            tile.item = self.canvas.create_image(x, y, image=tile.photo, anchor='nw', tags=self.tag)
+
+            if self.opacity >= 1:
+                self.canvas.tag_lower(tile.item)
+        else:
+            self.canvas.itemconfigure(tile.item, image=tile.photo)
+            self.canvas.coords(tile.item, x, y)
+
+    def __photo(self, image):
+        """converts [image] to a PhotoImage, drawn with the opacity of the renderer"""
+
+        if self.opacity < 1:
+            image = image.copy()
+            image.putalpha(image.getchannel('A').point(lambda alpha: round(alpha * self.opacity)))
+
+        return ImageTk.PhotoImage(image)
+
+    def __removeTile(self, key):
+        tile = self.tiles.pop(key)
+
+        self.canvas.delete(tile.item)
+
+    def __blit(self, tile, x, y, pixels):
+        """writes [pixels] to the raster and displayed image of [tile], with the upper left corner at cell [x], [y]"""
+
+        char_width, char_height = self.cellSize()
+
+        image = Image.fromarray(pixels)
+        tile.raster.paste(image, (x * char_width, y * char_height))
+
+        # PhotoImage.paste always replaces the whole image, so the region is blitted with the tk photo copy command
+        region_img = self.__photo(image)
+
+        self.canvas.tk.call(str(tile.photo), 'copy', str(region_img), '-to', x * char_width, y * char_height,
+                            '-compositingrule', 'set')
@@ -2,7 +2,8 @@ from tkinter import *
 from tkinter import ttk
 import tkinter as tk
 from src.ColorPicker import ColorPicker
-from src.Palette import Palette, PaletteData
+from src.Palette import Palette
+from src.core.PaletteData import PaletteData
 from src.CharacterPicker import CharacterPicker
 
 
@@ -50,8 +51,25 @@ class Toolbar(ttk.Frame):
 
         self.editor_options = ttk.Frame(self.editor_frame, style='EditorOp.TFrame')
 
-        self.box_toggle = BooleanVar()
-        self.toggle_box = Checkbutton(self.editor_options, text='▦', variable=self.box_toggle, indicatoron=False, font='TkDefault 30')
+        # editing tools, the values are the names of the editor modes
+        self.mode_frame = ttk.Frame(self.editor_options)
+        self.mode = StringVar(value='PEN')
+
+        self.mode_buttons = [Radiobutton(self.mode_frame, text=text, value=value, variable=self.mode,
+                                         indicatoron=False, font='TkDefault 20')
+                             for text, value in (('✎', 'PEN'), ('▦', 'BOX'), ('▧', 'FILL'), ('⬚', 'SELECT'))]
+
+        # values a cell must share with the clicked cell to be filled by the fill tool
+        self.match_frame = ttk.Frame(self.editor_options)
+
+        self.match_character = BooleanVar(value=True)
+        self.match_foreground = BooleanVar(value=True)
+        self.match_background = BooleanVar(value=True)
+
+        self.match_label = ttk.Label(self.match_frame, text='Fill match ')
+        self.match_buttons = [ttk.Checkbutton(self.match_frame, text=text, variable=variable)
+                              for text, variable in (('ch', self.match_character), ('fg', self.match_foreground),
+                                                     ('bg', self.match_background))]
 
         def validate(val):
             if val == '':
@@ -87,7 +105,16 @@ class Toolbar(ttk.Frame):
         self.editor_options.columnconfigure([1, 2], weight=1)
         self.editor_options.rowconfigure([0, 1], weight=1)
 
-        self.toggle_box.grid(column=0, row=0, rowspan=2)
+        self.mode_frame.grid(column=0, row=0, rowspan=2)
+
+        for column, button in enumerate(self.mode_buttons):
+            button.grid(column=column, row=0)
+
+        self.match_frame.grid(column=0, row=2, columnspan=3, sticky='W')
+        self.match_label.grid(column=0, row=0)
+
+        for column, button in enumerate(self.match_buttons, 1):
+            button.grid(column=column, row=0)
 
         self.width_label.grid(column=1, row=0, sticky='E')
         self.width_input.grid(column=2, row=0, sticky='EW')
@@ -149,16 +176,24 @@ class Toolbar(ttk.Frame):
             self.width_input.unbind('<Return>')
             self.height_input.unbind('<Return>')
 
-    def onBoxToggle(self, func):
+    def onModeChange(self, func):
         """
-        calls [func] when the box mode checkbox has changed.
-        [func] should accept a boolean value representing whether box mode is on.
+        calls [func] when another editing tool is selected.
+        [func] should accept the name of the selected mode, either PEN, BOX, FILL or SELECT.
         """
 
-        if func is not None:
-            self.toggle_box.bind('<1>', lambda e: func(not self.box_toggle.get()))
-        else:
-            self.toggle_box.unbind('<1>')
+        for button in self.mode_buttons:
+            button['command'] = (lambda: func(self.mode.get())) if func is not None else ''
+
+    def onFillMatchChange(self, func):
+        """
+        calls [func] when the values matched by the fill tool have changed.
+        [func] should accept three booleans, whether the character, foreground and background have to match.
+        """
+
+        for button in self.match_buttons:
+            button['command'] = (lambda: func(self.match_character.get(), self.match_foreground.get(),
+                                              self.match_background.get())) if func is not None else ''
 
     def __onForegroundChange(self, color):
         self.character_picker.changeForeground(color)
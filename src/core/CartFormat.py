@@ -0,0 +1,207 @@
+import struct
+import zlib
+
+import numpy as np
+
+from src.core.TextureData import CELL_DTYPE
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# layout of version 2 .cart files.
+#
+# a header holding the magic bytes, the version, the number of sections and the texture size,
+# followed by a table with the tag, offset and size of every section.
+# every section stores a plane of fixed size values for all cells in row major order, so any cell can be located
+# directly from its position:
+#
+#     CHAR    uint32 codepoint of the character, 0 if it is not set
+#     FGND    rgba bytes of the foreground color
+#     BGND    rgba bytes of the background color
+#     MASK    uint8 bit mask of the set values, see TextureData
+#
+# version 3 files are compressed, the cells are split into chunks of CART_CHUNK_SIZE x CART_CHUNK_SIZE cells
+# which are compressed independently, so any region can be read by only decompressing the chunks it overlaps:
+#
+#     INFO    codec tag and chunk size
+#     INDX    offset and size of every compressed chunk inside DATA, chunks are ordered row by row
+#     DATA    the compressed chunks, chunks of only empty cells are left out and have a size of 0
+#
+# before compression, every plane of a chunk is run length encoded, see encodeChunk.
+#
+# files of both versions can hold an animation, with the number of frames stored in an extra section:
+#
+#     FRMS    uint32 number of frames
+#
+# the planes of version 2 files then hold the cells of every frame after each other, and the chunk index of
+# version 3 files lists the chunks of every frame after each other. files without it hold a single frame.
+#
+# sections with unknown tags are ignored by readers.
+# version 1 files have no header, they start with the texture size and store variable sized cells.
+
+CART_MAGIC = b'CART'
+
+# version written by default, later versions are opt in since the engine and CartToArt only read version 1
+CART_VERSION = 1
+
+# magic, version, section count, width, height
+CART_HEADER = struct.Struct('<4sHHQQ')
+
+# tag, offset, size in bytes
+CART_SECTION = struct.Struct('<4sQQ')
+
+# section offsets are aligned to this many bytes, so the planes can be viewed as arrays of their element type
+CART_ALIGNMENT = 16
+
+# maps the tag of every section to the dtype and shape of a single cell value, and the cell field it holds
+CART_PLANES = {
+    b'CHAR': (np.dtype('<u4'), (), 'character'),
+    b'FGND': (np.dtype('u1'), (4,), 'foreground'),
+    b'BGND': (np.dtype('u1'), (4,), 'background'),
+    b'MASK': (np.dtype('u1'), (), 'mask'),
+}
+
+
+# number of frames
+CART_FRAMES = struct.Struct('<I')
+
+# codec tag, chunk size
+CART_INFO = struct.Struct('<4sI')
+
+# entry of the chunk index
+CART_INDEX_ENTRY = np.dtype([('offset', '<u8'), ('size', '<u4')])
+
+# width and height in cells of the chunks of compressed files
+CART_CHUNK_SIZE = 64
+
+# compression codecs of version 3 files, zstd is only available if the zstandard package is installed
+CART_CODECS = (b'zlib', b'zstd')
+
+
+def isCart2(data):
+    """returns true if the bytes [data] start with the header of a version 2 or later .cart file"""
+
+    return bytes(data[:len(CART_MAGIC)]) == CART_MAGIC
+
+
+def sectionLayout(width, height, frames=1):
+    """
+    returns the (tag, offset, size) of every section of a version 2 file holding [frames] frames of
+    [width] x [height] cells. the frame count is only stored if there is more than one frame.
+    """
+
+    offset = CART_HEADER.size + (len(CART_PLANES) + (frames > 1)) * CART_SECTION.size
+    layout = []
+
+    if frames > 1:
+        layout.append((b'FRMS', offset, CART_FRAMES.size))
+        offset += CART_FRAMES.size
+
+    for tag, (dtype, shape, _) in CART_PLANES.items():
+        offset = -(-offset // CART_ALIGNMENT) * CART_ALIGNMENT
+        size = frames * width * height * dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+
+        layout.append((tag, offset, size))
+        offset += size
+
+    return layout
+
+
+def compress(data, codec):
+    if codec == b'zlib':
+        return zlib.compress(data, 6)
+
+    return _zstd(codec).ZstdCompressor(level=9).compress(data)
+
+
+def decompress(data, codec):
+    """returns the decompressed [data], corrupt data raises a ValueError"""
+
+    if codec == b'zlib':
+        try:
+            return zlib.decompress(data)
+        except zlib.error as error:
+            raise ValueError(f'corrupt .cart chunk: {error}') from None
+
+    zstd = _zstd(codec)
+
+    try:
+        return zstd.ZstdDecompressor().decompress(data)
+    except zstd.ZstdError as error:
+        raise ValueError(f'corrupt .cart chunk: {error}') from None
+
+
+def encodeChunk(cells, codec):
+    """
+    returns the compressed version 3 data of the [cells] of a chunk, or empty bytes if every cell is empty.
+    every plane is stored as the number of runs of equal values as an uint32, the length of every run as uint16
+    and the value of every run.
+    """
+
+    if not cells['mask'].any():
+        return b''
+
+    runs = []
+
+    for dtype, _, field in CART_PLANES.values():
+        values = np.ascontiguousarray(cells[field].astype(dtype, copy=False)).reshape(cells.size, -1).view(np.uint8)
+
+        starts = np.concatenate(([0], np.flatnonzero((values[1:] != values[:-1]).any(axis=1)) + 1))
+        lengths = np.diff(np.append(starts, cells.size))
+
+        runs += [len(starts).to_bytes(4, 'little'), lengths.astype('<u2').tobytes(), values[starts].tobytes()]
+
+    return compress(b''.join(runs), codec)
+
+
+def decodeChunk(data, shape, codec):
+    """
+    returns the cells of shape [shape] stored in the compressed chunk [data] written by encodeChunk.
+    corrupt or truncated chunks raise a ValueError.
+    """
+
+    cells = np.zeros(shape, dtype=CELL_DTYPE)
+
+    if len(data) == 0:
+        return cells
+
+    data = np.frombuffer(decompress(data, codec), dtype=np.uint8)
+    offset = 0
+
+    for dtype, plane_shape, field in CART_PLANES.values():
+        if offset + 4 > len(data):
+            raise ValueError('truncated .cart chunk')
+
+        count = int(data[offset:offset + 4].view('<u4')[0])
+        offset += 4
+
+        value_size = dtype.itemsize * int(np.prod(plane_shape, dtype=np.int64))
+
+        if offset + count * (2 + value_size) > len(data):
+            raise ValueError('truncated .cart chunk')
+
+        lengths = data[offset:offset + 2 * count].view('<u2')
+        offset += 2 * count
+
+        # the runs of every plane cover the chunk exactly
+        if int(lengths.sum(dtype=np.int64)) != cells.size:
+            raise ValueError(f'corrupt .cart chunk: runs of {field} do not cover the {shape[1]} x {shape[0]} cells')
+
+        values = data[offset:offset + count * value_size].view(dtype).reshape((count,) + plane_shape)
+        offset += count * value_size
+
+        cells[field] = np.repeat(values, lengths, axis=0).reshape(shape + plane_shape)
+
+    return cells
+
+
+def _zstd(codec):
+    if codec != b'zstd':
+        raise ValueError(f'unknown .cart compression codec {codec.decode(errors="replace")}')
+
+    if zstandard is None:
+        raise ValueError('zstd compressed .cart files require the zstandard package')
+
+    return zstandard
@@ -0,0 +1,329 @@
+import numpy as np
+
+from src.core.TextureData import CELL_DTYPE, packCell, unpackCell, paintCells, cellBytes
+
+# width and height in cells of a single chunk
+CHUNK_SIZE = 32
+
+
+class Chunk:
+    """
+    a CHUNK_SIZE x CHUNK_SIZE block of cells.
+    [dirty] is set whenever the cells are modified, and [raster] can hold a (font key, image) pair rendered from the
+    cells, which is only valid while [dirty] is not set.
+    """
+
+    __slots__ = ('cells', 'dirty', 'raster')
+
+    def __init__(self, cells=None):
+        if cells is None:
+            cells = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=CELL_DTYPE)
+
+        self.cells = cells
+        self.dirty = True
+        self.raster = None
+
+    def isEmpty(self):
+        return not self.cells['mask'].any()
+
+
+class ChunkedTextureData:
+    """
+    stores the cells of a texture in chunks of CHUNK_SIZE x CHUNK_SIZE cells, which are only allocated once a
+    non empty cell is written to them. empty chunks take up no memory, so very large and mostly empty textures can
+    be edited without allocating the full grid.
+    chunks can be shared with copies made by [share], a shared chunk is copied before it is written to.
+    provides the same interface as TextureData, except direct access to a [cells] array.
+    """
+
+    def __init__(self, width=0, height=0):
+        self.__width = width
+        self.__height = height
+
+        # maps (chunk_x, chunk_y) to populated Chunk objects
+        self.chunks = {}
+
+        # keys of chunks which may also be used by other textures
+        self.__shared = set()
+
+    @property
+    def width(self):
+        return self.__width
+
+    @property
+    def height(self):
+        return self.__height
+
+    def chunkAt(self, chunk_x, chunk_y):
+        """returns the Chunk at [chunk_x], [chunk_y], or None if it is empty"""
+
+        return self.chunks.get((chunk_x, chunk_y))
+
+    def populatedChunks(self):
+        """returns a list of ((chunk_x, chunk_y), Chunk) pairs of every allocated chunk"""
+
+        return list(self.chunks.items())
+
+    def get(self, x, y):
+        chunk = self.chunks.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+
+        if chunk is None:
+            return unpackCell(np.zeros((), dtype=CELL_DTYPE))
+
+        return unpackCell(chunk.cells[y % CHUNK_SIZE, x % CHUNK_SIZE])
+
+    def set(self, x, y, data):
+        self.setRegion(x, y, packCell(data).reshape(1, 1))
+
+    def region(self, x0, y0, x1, y1):
+        cells = np.zeros((y1 - y0, x1 - x0), dtype=CELL_DTYPE)
+
+        for _, chunk, chunk_slice, region_slice in self.__overlapping(x0, y0, x1, y1):
+            cells[region_slice] = chunk.cells[chunk_slice]
+
+        return cells
+
+    def setRegion(self, x, y, cells):
+        x1, y1 = x + cells.shape[1], y + cells.shape[0]
+
+        for key, chunk, chunk_slice, region_slice in self.__overlapping(x, y, x1, y1, all_chunks=True):
+            part = cells[region_slice]
+
+            if chunk is None:
+                # writing empty cells to an empty chunk changes nothing
+                if not part['mask'].any():
+                    continue
+
+                chunk = self.__newChunk(key)
+            else:
+                chunk = self.__writable(key)
+
+            chunk.cells[chunk_slice] = part
+            chunk.dirty = True
+
+        self.__freeEmpty(x, y, x1, y1)
+
+    def gather(self, ys, xs):
+        cells = np.zeros(len(ys), dtype=CELL_DTYPE)
+
+        for key, indices in self.__groupByChunk(ys, xs):
+            chunk = self.chunks.get(key)
+
+            if chunk is not None:
+                cells[indices] = chunk.cells[ys[indices] % CHUNK_SIZE, xs[indices] % CHUNK_SIZE]
+
+        return cells
+
+    def scatter(self, ys, xs, cells):
+        ys, xs = np.asarray(ys), np.asarray(xs)
+
+        # cells outside of the texture are dropped, like the cells of regions reaching past its edges
+        inside = (ys >= 0) & (ys < self.height) & (xs >= 0) & (xs < self.width)
+
+        if not inside.all():
+            ys, xs, cells = ys[inside], xs[inside], cells[inside]
+
+        for key, indices in self.__groupByChunk(ys, xs):
+            chunk = self.__writable(key)
+
+            if chunk is None:
+                if not cells[indices]['mask'].any():
+                    continue
+
+                chunk = self.__newChunk(key)
+
+            chunk.cells[ys[indices] % CHUNK_SIZE, xs[indices] % CHUNK_SIZE] = cells[indices]
+            chunk.dirty = True
+
+            if chunk.isEmpty():
+                del self.chunks[key]
+
+    def paint(self, x0, y0, x1, y1, data):
+        cell = packCell(data)
+
+        if not cell['mask']:
+            return
+
+        for key, chunk, chunk_slice, _ in self.__overlapping(x0, y0, x1, y1, all_chunks=True):
+            chunk = self.__newChunk(key) if chunk is None else self.__writable(key)
+
+            paintCells(chunk.cells[chunk_slice], cell)
+            chunk.dirty = True
+
+    def erase(self, x0, y0, x1, y1):
+        for key, _, chunk_slice, _ in self.__overlapping(x0, y0, x1, y1):
+            chunk = self.__writable(key)
+            chunk.cells[chunk_slice] = np.zeros((), dtype=CELL_DTYPE)
+            chunk.dirty = True
+
+        self.__freeEmpty(x0, y0, x1, y1)
+
+    def occupied(self, x0, y0, x1, y1):
+        """returns the index arrays (ys, xs) of every non empty cell in the given region"""
+
+        ys, xs = [], []
+
+        for _, chunk, chunk_slice, region_slice in self.__overlapping(x0, y0, x1, y1):
+            chunk_ys, chunk_xs = np.nonzero(chunk.cells[chunk_slice]['mask'])
+
+            ys.append(chunk_ys + y0 + region_slice[0].start)
+            xs.append(chunk_xs + x0 + region_slice[1].start)
+
+        if not ys:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        return np.concatenate(ys), np.concatenate(xs)
+
+    def resize(self, width, height):
+        # cells outside the new size are cleared, so growing the texture again reveals empty cells
+        self.erase(width, 0, self.width, min(height, self.height))
+        self.erase(0, height, self.width, self.height)
+
+        self.__width = width
+        self.__height = height
+
+    def share(self):
+        """
+        returns a copy of the texture which uses the same chunks, so unchanged parts take up no additional memory.
+        a chunk is only copied once either of the textures writes to it.
+        """
+
+        copy = type(self)(self.width, self.height)
+        copy.chunks = dict(self.chunks)
+
+        self.__shared.update(self.chunks)
+        copy.__shared = set(self.chunks)
+
+        return copy
+
+    def nbytes(self, seen=None):
+        """
+        returns the size in bytes of the cells of every chunk.
+        chunks whose id is in the set [seen] are not counted, and counted chunks are added to it.
+        """
+
+        seen = set() if seen is None else seen
+        size = 0
+
+        for chunk in self.chunks.values():
+            if id(chunk) not in seen:
+                seen.add(id(chunk))
+                size += chunk.cells.nbytes
+
+        return size
+
+    def copy(self):
+        copy = type(self)(self.width, self.height)
+
+        for key, chunk in self.chunks.items():
+            copy.chunks[key] = Chunk(chunk.cells.copy())
+
+        return copy
+
+    def __eq__(self, other):
+        if not isinstance(other, ChunkedTextureData) or (self.width, self.height) != (other.width, other.height):
+            return False
+
+        for key in self.chunks.keys() | other.chunks.keys():
+            a, b = self.chunks.get(key), other.chunks.get(key)
+
+            a = a.cells if a is not None else np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=CELL_DTYPE)
+            b = b.cells if b is not None else np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=CELL_DTYPE)
+
+            if not np.array_equal(cellBytes(a), cellBytes(b)):
+                return False
+
+        return True
+
+    def __newChunk(self, key):
+        """allocates an empty chunk at [key]"""
+
+        self.__shared.discard(key)
+
+        chunk = self.chunks[key] = Chunk()
+
+        return chunk
+
+    def __writable(self, key):
+        """returns the chunk at [key], copying it first if it may be shared with another texture"""
+
+        chunk = self.chunks.get(key)
+
+        if chunk is not None and key in self.__shared:
+            self.__shared.discard(key)
+
+            # the raster of the shared chunk may be displayed in a tile which is drawn over by this edit
+            chunk.dirty = True
+
+            chunk = self.chunks[key] = Chunk(chunk.cells.copy())
+
+        return chunk
+
+    def __freeEmpty(self, x0, y0, x1, y1):
+        """removes chunks in the given region which no longer hold any cells"""
+
+        for key in self.__chunkKeys(x0, y0, x1, y1):
+            if self.chunks[key].isEmpty():
+                del self.chunks[key]
+
+    def __chunkKeys(self, x0, y0, x1, y1, all_chunks=False):
+        """
+        returns the keys of every populated chunk overlapping the given region,
+        or of every chunk including empty ones if [all_chunks] is true.
+        """
+
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+
+        if x0 >= x1 or y0 >= y1:
+            return []
+
+        cx0, cy0 = x0 // CHUNK_SIZE, y0 // CHUNK_SIZE
+        cx1, cy1 = (x1 - 1) // CHUNK_SIZE + 1, (y1 - 1) // CHUNK_SIZE + 1
+
+        if all_chunks:
+            return [(cx, cy) for cy in range(cy0, cy1) for cx in range(cx0, cx1)]
+
+        # large regions are faster to handle by only looking at the populated chunks
+        if (cx1 - cx0) * (cy1 - cy0) > len(self.chunks):
+            return [key for key in self.chunks if cx0 <= key[0] < cx1 and cy0 <= key[1] < cy1]
+
+        return [(cx, cy) for cy in range(cy0, cy1) for cx in range(cx0, cx1) if (cx, cy) in self.chunks]
+
+    def __overlapping(self, x0, y0, x1, y1, all_chunks=False):
+        """
+        yields a (key, chunk, chunk_slice, region_slice) tuple for every populated chunk overlapping the given region,
+        where [chunk_slice] indexes the overlapping cells in the chunk and [region_slice] indexes them in the region.
+        if [all_chunks] is true, empty chunks are yielded as well, with None as the chunk.
+        only the cells inside the texture are included.
+        """
+
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+
+        for cx, cy in self.__chunkKeys(x0, y0, x1, y1, all_chunks):
+            chunk_x, chunk_y = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+
+            sx0, sy0 = max(x0, chunk_x), max(y0, chunk_y)
+            sx1, sy1 = min(x1, chunk_x + CHUNK_SIZE), min(y1, chunk_y + CHUNK_SIZE)
+
+            chunk_slice = (slice(sy0 - chunk_y, sy1 - chunk_y), slice(sx0 - chunk_x, sx1 - chunk_x))
+            region_slice = (slice(sy0 - y0, sy1 - y0), slice(sx0 - x0, sx1 - x0))
+
+            yield (cx, cy), self.chunks.get((cx, cy)), chunk_slice, region_slice
+
+    @staticmethod
+    def __groupByChunk(ys, xs):
+        """yields (chunk key, indices) pairs grouping the cells at [ys], [xs] by the chunk they are in"""
+
+        if len(ys) == 0:
+            return
+
+        cxs, cys = np.asarray(xs) // CHUNK_SIZE, np.asarray(ys) // CHUNK_SIZE
+
+        keys = cys.astype(np.int64) << 32 | cxs.astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+
+        for key, indices in zip(unique_keys, np.split(order, starts[1:])):
+            yield (int(key & 0xffffffff), int(key >> 32)), indices
@@ -0,0 +1,275 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.core.TextureData import CHARACTER
+from src.core.CartFormat import CART_MAGIC, CART_VERSION, CART_HEADER, CART_SECTION, CART_PLANES, sectionLayout, \
+    CART_INFO, CART_FRAMES, CART_INDEX_ENTRY, CART_CHUNK_SIZE, encodeChunk, compress
+
+# maximum number of cells converted at once, larger textures are written in blocks of rows
+BLOCK_CELLS = 1 << 20
+
+# maps every byte value to the codepoints of its two lowercase hex digits
+HEX_DIGITS = np.array([[ord(digit) for digit in format(val, '02x')] for val in range(256)], dtype=np.uint32)
+
+
+def export(texture, path, cart_version=CART_VERSION):
+    """
+    writes [texture] to [path], as an .art file if the suffix is .art, as a compressed .cart file if the suffix is
+    .cartz and as a .cart file of [cart_version] otherwise
+    """
+
+    suffix = Path(path).suffix
+
+    if suffix == '.art':
+        exportArt(texture, path)
+    elif suffix == '.cartz':
+        exportCart(texture, path, version=3)
+    else:
+        exportCart(texture, path, version=cart_version)
+
+
+def exportArt(texture, path):
+    """writes [texture] to [path] as an Ascii Render texture file"""
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(f'// size\n{texture.width} {texture.height}\n\n')
+
+        file.write('// symbols\n')
+        file.writelines(_symbolBlock(cells) for cells in rowBlocks(texture))
+        file.write('\n')
+
+        file.write('// foreground color\n')
+        file.writelines(_colorBlock(cells['foreground']) for cells in rowBlocks(texture))
+        file.write('\n')
+
+        file.write('// background color\n')
+        file.writelines(_colorBlock(cells['background']) for cells in rowBlocks(texture))
+
+
+def exportCart(texture, path, version=CART_VERSION, codec=b'zlib'):
+    """
+    writes [texture] to [path] as a Compact Ascii Render texture file of the given [version].
+    version 1 stores the width and height as 64 bit integers, followed by every cell as its utf-8 encoded character
+    (a single zero byte if it is not set), its foreground color and its background color as rgba bytes.
+    version 2 stores fixed size planes of every cell value, and version 3 stores chunks compressed with [codec],
+    see CartFormat.
+    """
+
+    if version == 2:
+        _exportCart2([texture], path)
+        return
+
+    if version == 3:
+        _exportCart3([texture], path, codec)
+        return
+
+    if version != 1:
+        raise ValueError(f'cannot write .cart version {version}')
+
+    with open(path, 'wb') as file:
+        file.write(texture.width.to_bytes(8, 'little'))
+        file.write(texture.height.to_bytes(8, 'little'))
+
+        file.writelines(_cartBlock(cells) for cells in rowBlocks(texture))
+
+
+def _exportCart2(frames, path):
+    width, height = frames[0].width, frames[0].height
+
+    layout = sectionLayout(width, height, len(frames))
+
+    with open(path, 'wb') as file:
+        file.write(CART_HEADER.pack(CART_MAGIC, 2, len(layout), width, height))
+
+        for tag, offset, size in layout:
+            file.write(CART_SECTION.pack(tag, offset, size))
+
+        for tag, offset, size in layout:
+            # pad up to the aligned start of the section
+            file.write(bytes(offset - file.tell()))
+
+            if tag == b'FRMS':
+                file.write(CART_FRAMES.pack(len(frames)))
+                continue
+
+            dtype, _, field = CART_PLANES[tag]
+
+            for texture in frames:
+                file.writelines(cells[field].astype(dtype, copy=False).tobytes() for cells in rowBlocks(texture))
+
+
+def _exportCart3(frames, path, codec):
+    # fails before anything is written if [codec] is not available
+    compress(b'', codec)
+
+    width, height = frames[0].width, frames[0].height
+
+    chunk_count_x = -(-width // CART_CHUNK_SIZE)
+    chunk_count_y = -(-height // CART_CHUNK_SIZE)
+    chunk_count = chunk_count_x * chunk_count_y
+
+    index = np.zeros(len(frames) * chunk_count, dtype=CART_INDEX_ENTRY)
+
+    section_count = 3 if len(frames) == 1 else 4
+
+    info_offset = CART_HEADER.size + section_count * CART_SECTION.size
+    frames_offset = info_offset + CART_INFO.size
+    index_offset = frames_offset + (CART_FRAMES.size if len(frames) > 1 else 0)
+    data_offset = index_offset + index.nbytes
+
+    with open(path, 'wb') as file:
+        file.write(CART_HEADER.pack(CART_MAGIC, 3, section_count, width, height))
+
+        file.write(CART_SECTION.pack(b'INFO', info_offset, CART_INFO.size))
+
+        if len(frames) > 1:
+            file.write(CART_SECTION.pack(b'FRMS', frames_offset, CART_FRAMES.size))
+
+        file.write(CART_SECTION.pack(b'INDX', index_offset, index.nbytes))
+
+        # the size of the data is only known once every chunk is compressed, so it is written afterwards
+        data_section = file.tell()
+        file.write(CART_SECTION.pack(b'DATA', data_offset, 0))
+
+        file.write(CART_INFO.pack(codec, CART_CHUNK_SIZE))
+
+        if len(frames) > 1:
+            file.write(CART_FRAMES.pack(len(frames)))
+
+        # the index is filled in while the chunks are written
+        file.write(index.tobytes())
+
+        size = 0
+
+        for frame, texture in enumerate(frames):
+            for chunk_y, cells in enumerate(rowBlocks(texture, CART_CHUNK_SIZE * max(1, width))):
+                for chunk_x in range(chunk_count_x):
+                    data = encodeChunk(cells[:, chunk_x * CART_CHUNK_SIZE:(chunk_x + 1) * CART_CHUNK_SIZE], codec)
+
+                    index[frame * chunk_count + chunk_y * chunk_count_x + chunk_x] = (size, len(data))
+
+                    file.write(data)
+                    size += len(data)
+
+        file.seek(data_section)
+        file.write(CART_SECTION.pack(b'DATA', data_offset, size))
+
+        file.seek(index_offset)
+        file.write(index.tobytes())
+
+
+def exportFrames(frames, path, version=2, codec=b'zlib'):
+    """
+    writes the list of equally sized textures [frames] to [path] as the frames of a single
+    Compact Ascii Render texture file of [version] 2 or 3, see exportCart.
+    frames only have to provide a width, a height and a region method, so layer stacks are written without
+    flattening them as a whole.
+    """
+
+    if not frames:
+        raise ValueError('cannot write a .cart file without frames')
+
+    if any((frame.width, frame.height) != (frames[0].width, frames[0].height) for frame in frames):
+        raise ValueError('every frame of a .cart file must have the same size')
+
+    if version == 2:
+        _exportCart2(frames, path)
+    elif version == 3:
+        _exportCart3(frames, path, codec)
+    else:
+        raise ValueError(f'cannot write frames to .cart version {version}')
+
+
+def rowBlocks(texture, block_cells=BLOCK_CELLS):
+    """yields the cells of [texture] in blocks of whole rows with at most [block_cells] cells, unless a row is longer"""
+
+    block_height = max(1, block_cells // max(1, texture.width))
+
+    for y0 in range(0, texture.height, block_height):
+        yield texture.region(0, y0, texture.width, min(y0 + block_height, texture.height))
+
+
+def encodeUtf8(codepoints):
+    """
+    encodes the array of [codepoints] as utf-8.
+    returns the encoded bytes as an uint8 array, and the number of bytes used by every codepoint.
+    """
+
+    codepoints = codepoints.astype(np.uint32)
+
+    lengths = 1 + (codepoints >= 0x80) + (codepoints >= 0x800) + (codepoints >= 0x10000)
+    starts = np.cumsum(lengths) - lengths
+
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+
+    # leading byte, with the length prefix for multi byte characters
+    lead_shift = 6 * (lengths - 1)
+    lead_prefix = np.array([0x00, 0x00, 0xc0, 0xe0, 0xf0], dtype=np.uint32)[lengths]
+
+    out[starts] = lead_prefix | (codepoints >> lead_shift)
+
+    # continuation bytes hold 6 bits each
+    for i in range(1, 4):
+        has_byte = lengths > i
+
+        out[starts[has_byte] + i] = 0x80 | ((codepoints[has_byte] >> (6 * (lengths[has_byte] - 1 - i))) & 0x3f)
+
+    return out, lengths
+
+
+def _symbolBlock(cells):
+    """returns the symbols section lines of [cells], every cell takes two characters, unset characters are written as 00"""
+
+    height, width = cells.shape
+
+    has_char = (cells['mask'] & CHARACTER).astype(bool)
+
+    chars = np.empty((height, width, 2), dtype=np.uint32)
+    chars[..., 0] = np.where(has_char, cells['character'], ord('0'))
+    chars[..., 1] = np.where(has_char, ord(' '), ord('0'))
+
+    lines = np.full((height, width * 2 + 1), ord('\n'), dtype=np.uint32)
+    lines[:, :-1] = chars.reshape(height, -1)
+
+    return lines.astype('<u4').tobytes().decode('utf-32-le')
+
+
+def _colorBlock(colors):
+    """returns the color section lines of the rgba array [colors], every color is written as 8 hex digits"""
+
+    height, width = colors.shape[:2]
+
+    digits = np.full((height, width, 9), ord(' '), dtype=np.uint8)
+    digits[..., :8] = HEX_DIGITS[colors].reshape(height, width, 8)
+
+    lines = np.full((height, width * 9 + 1), ord('\n'), dtype=np.uint8)
+    lines[:, :-1] = digits.reshape(height, -1)
+
+    return lines.tobytes().decode('ascii')
+
+
+def _cartBlock(cells):
+    """returns the .cart cell records of [cells]"""
+
+    cells = cells.reshape(-1)
+
+    # unset characters are zero, which is encoded as a single zero byte
+    characters, lengths = encodeUtf8(cells['character'])
+
+    record_lengths = lengths + 8
+    starts = np.cumsum(record_lengths) - record_lengths
+
+    out = np.empty(int(record_lengths.sum()), dtype=np.uint8)
+
+    # place the encoded characters at the start of every record
+    char_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    out[np.arange(len(characters)) + char_offsets] = characters
+
+    color_starts = starts + lengths
+
+    for i in range(4):
+        out[color_starts + i] = cells['foreground'][:, i]
+        out[color_starts + 4 + i] = cells['background'][:, i]
+
+    return out.tobytes()
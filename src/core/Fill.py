@@ -0,0 +1,129 @@
+import numpy as np
+
+from src.core.TextureData import CHARACTER, FOREGROUND, BACKGROUND, CELL_FIELDS
+
+# distance in cells from the seed to the edges of the first window read by a fill
+FILL_WINDOW = 64
+
+
+def matchingCells(cells, seed, match=CHARACTER | FOREGROUND | BACKGROUND):
+    """
+    returns a boolean array marking the [cells] which equal the single cell [seed] in every value selected by the
+    mask bits [match]. a set value never matches an unset one.
+    """
+
+    matches = np.ones(cells.shape, dtype=bool)
+
+    for bit, field in CELL_FIELDS:
+        if not match & bit:
+            continue
+
+        # unset values are zero, so comparing the mask bit and the value is enough
+        matches &= (cells['mask'] & bit) == (seed['mask'] & bit)
+
+        equal = cells[field] == seed[field]
+        matches &= equal.all(axis=-1) if equal.ndim > cells.ndim else equal
+
+    return matches
+
+
+def rowSpans(region):
+    """
+    returns the arrays (ys, starts, ends) of every horizontal run of true cells in the 2d boolean array [region],
+    ordered by row and then by column. runs are half open, [start, end).
+    """
+
+    height, width = region.shape
+
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = region
+
+    edges = np.diff(padded, axis=1)
+
+    ys, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    return ys, starts, ends
+
+
+def spanFill(region, x, y):
+    """
+    returns the index arrays (ys, xs) of the true cells of the 2d boolean array [region] which are connected to [x], [y]
+    through their edges. the fill walks whole runs of cells instead of single cells, so its cost depends on the number
+    of runs and not on the number of filled cells.
+    """
+
+    if not region[y, x]:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    ys, starts, ends = rowSpans(region)
+
+    # runs are ordered by row and column, so their start and end keys are sorted as well
+    stride = region.shape[1] + 1
+    start_keys = ys * stride + starts
+    end_keys = ys * stride + ends
+
+    # the runs of the next row which overlap a run form a single range [first, last)
+    first = np.searchsorted(end_keys, start_keys + stride, side='right')
+    last = np.searchsorted(start_keys, end_keys + stride, side='left')
+    counts = np.maximum(last - first, 0)
+
+    upper = np.repeat(np.arange(len(starts)), counts)
+    lower = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # neighbors of every run, in both directions
+    sources = np.concatenate((upper, lower))
+    order = np.argsort(sources, kind='stable')
+    neighbors = np.concatenate((lower, upper))[order].tolist()
+    offsets = np.searchsorted(sources[order], np.arange(len(starts) + 1)).tolist()
+
+    seed = int(np.searchsorted(start_keys, y * stride + x, side='right')) - 1
+
+    filled = [False] * len(starts)
+    filled[seed] = True
+
+    stack = [seed]
+
+    while stack:
+        run = stack.pop()
+
+        for neighbor in neighbors[offsets[run]:offsets[run + 1]]:
+            if not filled[neighbor]:
+                filled[neighbor] = True
+                stack.append(neighbor)
+
+    filled = np.array(filled, dtype=bool)
+
+    ys, starts, ends = ys[filled], starts[filled], ends[filled]
+    lengths = ends - starts
+
+    # expand every run to the columns it covers
+    columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - starts, lengths)
+
+    return np.repeat(ys, lengths), columns
+
+
+def floodFill(texture, x, y, match=CHARACTER | FOREGROUND | BACKGROUND):
+    """
+    returns the index arrays (ys, xs) of the cells of [texture] connected to the cell at [x], [y]
+    which equal it in every value selected by the mask bits [match].
+    only the cells in a window around [x], [y] are read, which grows while the fill reaches its edges,
+    so the memory of a fill depends on its size and not on the size of the texture.
+    """
+
+    seed = texture.region(x, y, x + 1, y + 1)[0, 0]
+    size = FILL_WINDOW
+
+    while True:
+        x0, y0 = max(x - size, 0), max(y - size, 0)
+        x1, y1 = min(x + size + 1, texture.width), min(y + size + 1, texture.height)
+
+        ys, xs = spanFill(matchingCells(texture.region(x0, y0, x1, y1), seed, match), x - x0, y - y0)
+
+        # the fill can only continue past edges of the window which are not edges of the texture
+        if not ((x0 > 0 and (xs == 0).any()) or (y0 > 0 and (ys == 0).any()) or
+                (x1 < texture.width and (xs == x1 - x0 - 1).any()) or
+                (y1 < texture.height and (ys == y1 - y0 - 1).any())):
+            return ys + y0, xs + x0
+
+        size *= 2
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+# fonts bundled in the resources folder, which can be used to display textures
+FONTS = {
+    'Consolas': './Resources/consola.ttf',
+    'Ubuntu Mono': './Resources/ubuntu.mono.ttf',
+}
+
+DEFAULT_FONT = 'Consolas'
+
+
+class CellFont(ImageFont.FreeTypeFont):
+    """
+    a truetype font with the size of a single texture cell precomputed,
+    so geometry lookups do not have to query the font metrics every time.
+    """
+
+    def __init__(self, path, size):
+        super().__init__(path, size, encoding='utf-8')
+
+        ascent, descent = self.getmetrics()
+
+        self.ascent = ascent
+        self.descent = descent
+
+        # cells are as wide as a space character and as high as the full line of the font
+        self.cell_width = round(self.getlength(' '))
+        self.cell_height = ascent + descent
+
+        self.cell_size = (self.cell_width, self.cell_height)
+
+
+class FontManager:
+    """
+    loads the bundled fonts at the sizes requested by the editor.
+    loaded fonts are cached per font and size, at most [capacity] are kept, the least recently used ones are dropped first.
+    """
+
+    def __init__(self, name=DEFAULT_FONT, capacity=32):
+        self.capacity = capacity
+
+        self.name = name
+
+        self.__fonts = OrderedDict()
+
+    @property
+    def name(self):
+        return self.__name
+
+    @name.setter
+    def name(self, name):
+        if name not in FONTS:
+            raise ValueError(f'unknown font {name}, available fonts are {", ".join(FONTS)}')
+
+        self.__name = name
+
+    def get(self, size):
+        """returns the selected font at [size]"""
+
+        key = (self.name, size)
+
+        font = self.__fonts.get(key)
+
+        if font is None:
+            font = CellFont(FONTS[self.name], size)
+            self.__fonts[key] = font
+
+            if len(self.__fonts) > self.capacity:
+                self.__fonts.popitem(last=False)
+        else:
+            self.__fonts.move_to_end(key)
+
+        return font
+
+    def clear(self):
+        self.__fonts.clear()
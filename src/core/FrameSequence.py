@@ -0,0 +1,80 @@
+from src.core.LayerStack import LayerStack
+
+
+class FrameSequence:
+    """
+    stores the frames of an animation, every frame is a LayerStack of the same size.
+    frames added as a copy share every chunk with the frame they were copied from, until either of them changes it,
+    so the memory taken up by a sequence only grows with the parts which differ between its frames.
+    """
+
+    def __init__(self, width=0, height=0, chunked=True):
+        self.chunked = chunked
+
+        self.frames = [LayerStack(width, height, chunked)]
+        self.current = 0
+
+    @property
+    def width(self):
+        return self.frames[0].width
+
+    @property
+    def height(self):
+        return self.frames[0].height
+
+    @property
+    def current_frame(self):
+        return self.frames[self.current]
+
+    def addFrame(self, copy=True):
+        """
+        adds a frame after the current frame and makes it the current frame.
+        the new frame shares the cells of the current frame if [copy] is set, otherwise it has a single empty layer.
+        """
+
+        if copy:
+            frame = self.current_frame.share()
+        else:
+            frame = LayerStack(self.width, self.height, self.chunked)
+
+        self.current += 1
+        self.frames.insert(self.current, frame)
+
+        return frame
+
+    def removeFrame(self, index=None):
+        """removes the frame at [index] or the current frame, the last frame can not be removed"""
+
+        if len(self.frames) == 1:
+            return None
+
+        index = self.current if index is None else index
+
+        frame = self.frames.pop(index)
+
+        if index < self.current:
+            self.current -= 1
+
+        self.current = min(self.current, len(self.frames) - 1)
+
+        return frame
+
+    def frame(self, index):
+        """returns the frame at [index], or None if there is no such frame"""
+
+        return self.frames[index] if 0 <= index < len(self.frames) else None
+
+    def hasTexture(self, texture):
+        """returns if [texture] is the texture of a layer of any frame"""
+
+        return any(frame.hasTexture(texture) for frame in self.frames)
+
+    def nbytes(self):
+        """returns the size in bytes of the cells of every frame, chunks shared between frames are counted once"""
+
+        seen = set()
+
+        return sum(frame.nbytes(seen) for frame in self.frames)
+
+    def __len__(self):
+        return len(self.frames)
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# color of characters without a foreground color, this is the default ink of ImageDraw
+DEFAULT_FOREGROUND = (0xff, 0xff, 0xff, 0xff)
+
+# color of the one pixel border drawn on the top and left side of every cell
+GRID_COLOR = (0xff, 0xff, 0xff, 0xff)
+
+
+def cellSize(font):
+    """returns the width and height in pixels of a single cell drawn with [font]"""
+
+    # fonts loaded by the FontManager have their cell size precomputed
+    cell_size = getattr(font, 'cell_size', None)
+
+    if cell_size is not None:
+        return cell_size
+
+    ascent, descent = font.getmetrics()
+
+    return font.getsize(' ')[0], ascent + descent
+
+
+def blend(masks, foreground, background, grid=GRID_COLOR, out=None):
+    """
+    composites characters from their alpha [masks] of shape (..., height, width) and their [foreground]
+    and [background] colors of shape (..., 4).
+    the first row and column of every cell is filled with the [grid] color instead of the background.
+    returns an rgba array of shape (..., height, width, 4), written to [out] if it is passed.
+    """
+
+    if out is None:
+        out = np.empty(masks.shape + (4,), dtype=np.uint8)
+
+    foreground = np.asarray(foreground, dtype=np.uint16)
+    background = np.asarray(background, dtype=np.uint16)
+
+    alpha = masks.astype(np.uint16)
+    inverse = 255 - alpha
+
+    # blending one channel at a time keeps the innermost axes long, which is a lot faster than broadcasting rgba values
+    for channel in range(4):
+        pixels = np.broadcast_to(background[..., channel, None, None], masks.shape).copy()
+        pixels[..., 0, :] = grid[channel]
+        pixels[..., :, 0] = grid[channel]
+
+        # same rounding as the ImageDraw bitmap blending
+        pixels *= inverse
+        pixels += alpha * foreground[..., channel, None, None]
+        pixels += 127
+        pixels //= 255
+
+        out[..., channel] = pixels
+
+    return out
+
+
+class GlyphAtlas:
+    """
+    caches pre rendered alpha masks of characters, keyed by the font file, font size and codepoint.
+    when more than [capacity] masks are stored, the least recently used ones are evicted.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+
+        self.__masks = OrderedDict()
+
+    def mask(self, font, codepoint):
+        """returns the alpha mask of [codepoint] drawn with [font], codepoint 0 results in an empty mask"""
+
+        key = (font.path, font.size, codepoint)
+
+        mask = self.__masks.get(key)
+
+        if mask is None:
+            mask = self.__render(font, codepoint)
+            self.__masks[key] = mask
+
+            if len(self.__masks) > self.capacity:
+                self.__masks.popitem(last=False)
+        else:
+            self.__masks.move_to_end(key)
+
+        return mask
+
+    def masks(self, font, codepoints):
+        """returns the alpha masks of every codepoint in [codepoints] stacked in an array of shape (n, height, width)"""
+
+        char_width, char_height = cellSize(font)
+
+        masks = np.empty((len(codepoints), char_height, char_width), dtype=np.uint8)
+
+        for i, codepoint in enumerate(codepoints):
+            masks[i] = self.mask(font, int(codepoint))
+
+        return masks
+
+    def clear(self):
+        self.__masks.clear()
+
+    def __len__(self):
+        return len(self.__masks)
+
+    @staticmethod
+    def __render(font, codepoint):
+        img = Image.new('L', cellSize(font), 0)
+
+        if codepoint:
+            ImageDraw.Draw(img).text((0, 0), chr(codepoint), font=font, fill=0xff)
+
+        mask = np.asarray(img)
+        mask.flags.writeable = False
+
+        return mask
@@ -0,0 +1,272 @@
+import numpy as np
+
+from src.core.TextureData import CELL_DTYPE, cellBytes
+
+
+class Patch:
+    """
+    stores the cells of a texture which were changed by a single edit.
+    [ys] and [xs] index the changed cells, [old] and [new] hold their values before and after the edit.
+    if the edit resized the texture, [old_size] and [new_size] hold the (width, height) before and after.
+    """
+
+    __slots__ = ('texture', 'ys', 'xs', 'old', 'new', 'old_size', 'new_size')
+
+    def __init__(self, texture, ys, xs, old, new, old_size=None, new_size=None):
+        self.texture = texture
+        self.ys = ys
+        self.xs = xs
+        self.old = old
+        self.new = new
+        self.old_size = old_size
+        self.new_size = new_size
+
+    @property
+    def nbytes(self):
+        return self.ys.nbytes + self.xs.nbytes + self.old.nbytes + self.new.nbytes
+
+    def bounds(self):
+        """returns the region (x0, y0, x1, y1) covered by the changed cells, or None if no cells were changed"""
+
+        if len(self.ys) == 0:
+            return None
+
+        return int(self.xs.min()), int(self.ys.min()), int(self.xs.max()) + 1, int(self.ys.max()) + 1
+
+    def undo(self):
+        if self.old_size is not None:
+            self.texture.resize(*self.old_size)
+
+        self.texture.scatter(self.ys, self.xs, self.old)
+
+    def redo(self):
+        # indices of a resize patch point into the old size, so they must be written before resizing
+        self.texture.scatter(self.ys, self.xs, self.new)
+
+        if self.new_size is not None:
+            self.texture.resize(*self.new_size)
+
+
+class History:
+    """
+    keeps track of edits made to textures as patches of the changed cells, so they can be undone and redone.
+    an edit is started with [begin], every region is passed to [record] before it is modified,
+    and the edit is stored with [commit]. resizes are stored as their own edit, unless an edit has been started.
+    the history holds at most [max_entries] edits and [max_bytes] bytes, older edits are dropped first.
+    """
+
+    # pending records are coalesced when this many have been collected
+    COALESCE_COUNT = 64
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.undo_entries = []
+        self.redo_entries = []
+
+        self.nbytes = 0
+
+        # maps texture ids to the texture and a list of (ys, xs, old, regions) records of the current edit,
+        # cells inside the regions of a record which it does not list were empty when it was made
+        self.__pending = {}
+
+        # patches of the current edit, None if no edit has been started
+        self.__patches = None
+
+    def begin(self):
+        self.__pending = {}
+        self.__patches = []
+
+    def record(self, texture, x0, y0, x1, y1):
+        """
+        stores the current values of the given region of [texture], call this before the region is modified.
+        only the non empty cells are stored, like in [resize], cells which are written later are known to have been
+        empty, so the cost of a record depends on the cells in use and not on the size of the region.
+        """
+
+        x0, x1 = max(x0, 0), min(x1, texture.width)
+        y0, y1 = max(y0, 0), min(y1, texture.height)
+
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        ys, xs = texture.occupied(x0, y0, x1, y1)
+
+        self.__append(texture, (ys.astype(np.int32), xs.astype(np.int32), texture.gather(ys, xs), [(x0, y0, x1, y1)]))
+
+    def recordIndices(self, texture, ys, xs):
+        """stores the current values of the cells at [ys], [xs] in [texture], call this before the cells are modified"""
+
+        self.__append(texture, (ys.astype(np.int32), xs.astype(np.int32), texture.gather(ys, xs), []))
+
+    def commit(self):
+        """
+        stores the edit started by [begin] as a single history entry.
+        cells which were recorded but ended up unchanged are left out, and nothing is stored if no cells changed.
+        """
+
+        if self.__patches is None:
+            return False
+
+        self.__flush()
+
+        patches = self.__patches
+        self.__patches = None
+
+        if patches:
+            self.__push(patches)
+
+        return bool(patches)
+
+    def resize(self, texture, width, height):
+        """resizes [texture] to [width] and [height] and stores it in the history"""
+
+        old_size = (texture.width, texture.height)
+
+        # only non empty cells which are cut off by the new size have to be stored,
+        # as growing the texture again when undoing fills it with empty cells
+        strips = ((width, 0, texture.width, min(height, texture.height)),
+                  (0, height, texture.width, texture.height))
+
+        indices = [texture.occupied(*strip) for strip in strips]
+
+        ys = np.concatenate([strip_ys for strip_ys, _ in indices]).astype(np.int32)
+        xs = np.concatenate([strip_xs for _, strip_xs in indices]).astype(np.int32)
+
+        old = texture.gather(ys, xs)
+
+        # records made before the resize index the old size, so they are stored before the texture is resized
+        if self.__patches is not None:
+            self.__flush()
+
+        texture.resize(width, height)
+
+        patch = Patch(texture, ys, xs, old, np.zeros(len(ys), dtype=CELL_DTYPE), old_size, (width, height))
+
+        if self.__patches is None:
+            self.__push([patch])
+        else:
+            self.__patches.append(patch)
+
+    def undo(self):
+        """undoes the newest entry and returns its patches, or None if there is nothing to undo"""
+
+        if not self.undo_entries:
+            return None
+
+        patches = self.undo_entries.pop()
+        self.redo_entries.append(patches)
+
+        for patch in reversed(patches):
+            patch.undo()
+
+        return patches
+
+    def redo(self):
+        """redoes the newest undone entry and returns its patches, or None if there is nothing to redo"""
+
+        if not self.redo_entries:
+            return None
+
+        patches = self.redo_entries.pop()
+        self.undo_entries.append(patches)
+
+        for patch in patches:
+            patch.redo()
+
+        return patches
+
+    def clear(self):
+        self.undo_entries = []
+        self.redo_entries = []
+        self.nbytes = 0
+        self.__pending = {}
+        self.__patches = None
+
+    def __flush(self):
+        """converts the pending records to patches of the current edit, leaving out cells which did not change"""
+
+        for texture, records in self.__pending.values():
+            ys, xs, old, _ = self.__coalesce(texture, records)
+            new = texture.gather(ys, xs)
+
+            changed = (cellBytes(old) != cellBytes(new)).any(axis=1)
+
+            if changed.any():
+                self.__patches.append(Patch(texture, ys[changed], xs[changed], old[changed], new[changed]))
+
+        self.__pending = {}
+
+    def __push(self, patches):
+        # a new edit invalidates everything which has been undone
+        for entry in self.redo_entries:
+            self.nbytes -= self.__entrySize(entry)
+
+        self.redo_entries = []
+
+        self.undo_entries.append(patches)
+        self.nbytes += self.__entrySize(patches)
+
+        while len(self.undo_entries) > 1 and \
+                (len(self.undo_entries) > self.max_entries or self.nbytes > self.max_bytes):
+            self.nbytes -= self.__entrySize(self.undo_entries.pop(0))
+
+    def __append(self, texture, record):
+        _, records = self.__pending.setdefault(id(texture), (texture, []))
+        records.append(record)
+
+        if len(records) >= self.COALESCE_COUNT:
+            records[:] = [self.__coalesce(texture, records)]
+
+    @staticmethod
+    def __coalesce(texture, records):
+        """merges a list of records of [texture] into a single record, keeping the oldest value of every cell"""
+
+        parts = []
+        regions = []
+
+        for ys, xs, old, record_regions in records:
+            # cells inside the regions of earlier records already hold their oldest value
+            if regions:
+                keep = ~_inRegions(ys, xs, regions)
+                ys, xs, old = ys[keep], xs[keep], old[keep]
+
+            parts.append((ys, xs, old))
+
+            # cells of a region which have been written since the record was made were empty before
+            for region in record_regions:
+                written_ys, written_xs = texture.occupied(*region)
+
+                if regions:
+                    keep = ~_inRegions(written_ys, written_xs, regions)
+                    written_ys, written_xs = written_ys[keep], written_xs[keep]
+
+                parts.append((written_ys.astype(np.int32), written_xs.astype(np.int32),
+                              np.zeros(len(written_ys), dtype=CELL_DTYPE)))
+
+            regions += record_regions
+
+        ys = np.concatenate([part[0] for part in parts])
+        xs = np.concatenate([part[1] for part in parts])
+        old = np.concatenate([part[2] for part in parts])
+
+        # np.unique returns the index of the first occurrence, which is the value from before the edit
+        _, first = np.unique(ys.astype(np.int64) << 32 | xs.astype(np.int64), return_index=True)
+
+        return ys[first], xs[first], old[first], regions
+
+    @staticmethod
+    def __entrySize(patches):
+        return sum(patch.nbytes for patch in patches)
+
+
+def _inRegions(ys, xs, regions):
+    """returns a boolean array marking the cells at [ys], [xs] which are inside any of the (x0, y0, x1, y1) [regions]"""
+
+    inside = np.zeros(len(ys), dtype=bool)
+
+    for x0, y0, x1, y1 in regions:
+        inside |= (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+
+    return inside
@@ -0,0 +1,583 @@
+import mmap
+import os
+
+import numpy as np
+
+from src.core.TextureData import TextureData, CELL_DTYPE, CHARACTER, FOREGROUND, BACKGROUND
+from src.core.ChunkedTextureData import ChunkedTextureData, CHUNK_SIZE
+from src.core.CartFormat import CART_HEADER, CART_SECTION, CART_PLANES, isCart2, \
+    CART_INFO, CART_FRAMES, CART_INDEX_ENTRY, CART_CODECS, decodeChunk
+
+# size in bytes of the width and height stored at the start of a .cart file
+CART_HEADER_SIZE = 16
+
+# size in bytes of the foreground and background color following the character of every .cart cell
+CART_COLORS_SIZE = 8
+
+# maximum number of cells decoded at once, larger textures are read in blocks of rows
+BLOCK_CELLS = 1 << 20
+
+# layout of a .cart cell whose character is encoded as a single byte
+CART_ASCII_CELL = np.dtype([('character', 'u1'), ('foreground', 'u1', 4), ('background', 'u1', 4)])
+
+# maps every byte to the value of the hex digit it encodes, -1 if it is not a hex digit
+HEX_VALUES = np.full(256, -1, dtype=np.int16)
+HEX_VALUES[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+HEX_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+# sections of an .art file, in the order they are written
+ART_SECTIONS = ('size', 'symbols', 'foreground color', 'background color')
+
+# number of bytes of the utf-8 sequence starting with a given byte, 0 if the byte cannot start a sequence
+UTF8_LENGTHS = np.zeros(256, dtype=np.int64)
+UTF8_LENGTHS[0x00:0x80] = 1
+UTF8_LENGTHS[0xc0:0xe0] = 2
+UTF8_LENGTHS[0xe0:0xf0] = 3
+UTF8_LENGTHS[0xf0:0xf8] = 4
+
+# bits of the leading byte holding the codepoint, indexed by the sequence length
+UTF8_LEAD_MASKS = np.array([0x00, 0x7f, 0x1f, 0x0f, 0x07], dtype=np.uint32)
+
+
+def importArt(path, chunked=False):
+    """reads the Ascii Render texture file at [path] into a TextureData, or a ChunkedTextureData if [chunked] is set"""
+
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return readArt(file.read(), chunked)
+
+
+def readArt(text, chunked=False):
+    """
+    reads the contents of an .art file into a TextureData, or a ChunkedTextureData if [chunked] is set.
+    the sections are decoded in blocks of rows, malformed files raise a ValueError naming the offending line.
+    symbols written as 00 and colors of 00000000 are treated as not set.
+    """
+
+    sections = _artSections(text)
+
+    line, rows = sections['size']
+
+    try:
+        width, height = (int(val) for val in rows[0][1].split())
+    except (IndexError, ValueError):
+        raise ValueError(f'line {rows[0][0] if rows else line}: expected the width and height of the texture')
+
+    texture = _newTexture(width, height, chunked)
+
+    # rows of empty textures have no content
+    if width == 0 or height == 0:
+        return texture
+
+    for name in ART_SECTIONS[1:]:
+        line, rows = sections[name]
+
+        if len(rows) != height:
+            raise ValueError(f'line {line}: expected {height} rows of {name}, found {len(rows)}')
+
+    for y0, y1 in _rowBlocks(width, height):
+        codepoints = _artSymbols(sections['symbols'][1][y0:y1], width, y1 - y0)
+        foreground = _artColors(sections['foreground color'][1][y0:y1], width, y1 - y0)
+        background = _artColors(sections['background color'][1][y0:y1], width, y1 - y0)
+
+        texture.setRegion(0, y0, _cells(codepoints, foreground, background))
+
+    return texture
+
+
+def importCart(path, chunked=False):
+    """
+    reads the Compact Ascii Render texture file of any version at [path] into a TextureData,
+    or a ChunkedTextureData if [chunked] is set. only the first frame of animations is read, see importCartFrames.
+    """
+
+    # the mapping is released once the arrays viewing it are garbage collected
+    data = _mapFile(path)
+
+    if isCart2(data):
+        return CartFile(data).texture(chunked=chunked)
+
+    return readCart(data, chunked)
+
+
+def importCartFrames(path, chunked=False):
+    """
+    reads every frame of the Compact Ascii Render texture file of any version at [path] into a list of TextureData,
+    or of ChunkedTextureData if [chunked] is set
+    """
+
+    data = _mapFile(path)
+
+    if isCart2(data):
+        cart = CartFile(data)
+
+        return [cart.texture(frame, chunked) for frame in range(cart.frames)]
+
+    return [readCart(data, chunked)]
+
+
+class CartFile:
+    """
+    random access reader of version 2 and 3 .cart files.
+    the file is memory mapped and the cell planes are viewed in place, so reading a region only touches its cells.
+    for compressed version 3 files, only the chunks overlapping a region are decompressed.
+    animations hold [frames] frames, which are selected by the [frame] argument of the reading methods.
+    [source] is either a path or a buffer holding the file contents, only files opened from a path are closed.
+    """
+
+    def __init__(self, source):
+        self.__owned = isinstance(source, (str, os.PathLike))
+        self.__data = _mapFile(source) if self.__owned else source
+
+        data = np.frombuffer(self.__data, dtype=np.uint8)
+
+        if len(data) < CART_HEADER.size or not isCart2(data):
+            raise ValueError('data does not start with a .cart version 2 header')
+
+        _, self.version, section_count, self.width, self.height = CART_HEADER.unpack_from(self.__data)
+
+        if self.version not in (2, 3):
+            raise ValueError(f'.cart version {self.version} is not supported')
+
+        if CART_HEADER.size + section_count * CART_SECTION.size > len(data):
+            raise ValueError('.cart section table does not fit the file')
+
+        sections = {}
+
+        for i in range(section_count):
+            tag, offset, size = CART_SECTION.unpack_from(self.__data, CART_HEADER.size + i * CART_SECTION.size)
+
+            if offset + size > len(data):
+                raise ValueError(f'.cart section {tag.decode(errors="replace")} does not fit the file')
+
+            sections[tag] = (offset, size)
+
+        self.frames = 1
+
+        if b'FRMS' in sections:
+            if sections[b'FRMS'][1] != CART_FRAMES.size:
+                raise ValueError('.cart frame count has an invalid size')
+
+            self.frames, = CART_FRAMES.unpack_from(self.__data, sections[b'FRMS'][0])
+
+            if self.frames == 0:
+                raise ValueError('.cart data holds no frames')
+
+        # maps the cell fields to the planes holding them, viewed as arrays of shape (frames, height, width, ...)
+        self.planes = {}
+
+        if self.version == 3:
+            self.__readIndex(data, sections)
+            return
+
+        for tag, (offset, size) in sections.items():
+            if tag not in CART_PLANES:
+                continue
+
+            dtype, shape, field = CART_PLANES[tag]
+
+            plane_shape = (self.frames, self.height, self.width) + shape
+            count = int(np.prod(plane_shape, dtype=np.int64))
+
+            if size != count * dtype.itemsize:
+                raise ValueError(f'.cart section {tag.decode()} does not fit the texture size')
+
+            self.planes[field] = np.frombuffer(self.__data, dtype=dtype, count=count, offset=offset).reshape(plane_shape)
+
+        missing = set(CELL_DTYPE.names) - self.planes.keys()
+
+        if missing:
+            raise ValueError(f'.cart data is missing the sections of {", ".join(sorted(missing))}')
+
+    def region(self, x0, y0, x1, y1, frame=0):
+        """returns the cells of the given region of [frame], clamped to the texture"""
+
+        if not 0 <= frame < self.frames:
+            raise IndexError(f'.cart data has no frame {frame}')
+
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = max(x0, min(x1, self.width)), max(y0, min(y1, self.height))
+
+        if self.version == 3:
+            return self.__readChunks(x0, y0, x1, y1, frame)
+
+        cells = np.empty((y1 - y0, x1 - x0), dtype=CELL_DTYPE)
+
+        for field, plane in self.planes.items():
+            cells[field] = plane[frame, y0:y1, x0:x1]
+
+        return cells
+
+    def row(self, y, frame=0):
+        return self.region(0, y, self.width, y + 1, frame)[0]
+
+    def texture(self, frame=0, chunked=False):
+        """reads every cell of [frame] into a TextureData, or a ChunkedTextureData if [chunked] is set"""
+
+        texture = _newTexture(self.width, self.height, chunked)
+
+        if self.version == 3:
+            if not 0 <= frame < self.frames:
+                raise IndexError(f'.cart data has no frame {frame}')
+
+            sizes = self.index['size'][frame * self.chunk_count:(frame + 1) * self.chunk_count]
+
+            # empty chunks are not stored, so only the stored ones are decompressed
+            for chunk_y, chunk_x in zip(*np.divmod(np.flatnonzero(sizes), self.chunk_count_x)):
+                x0, y0 = int(chunk_x) * self.chunk_size, int(chunk_y) * self.chunk_size
+                texture.setRegion(x0, y0, self.region(x0, y0, x0 + self.chunk_size, y0 + self.chunk_size, frame))
+
+            return texture
+
+        for y0, y1 in _rowBlocks(self.width, self.height):
+            texture.setRegion(0, y0, self.region(0, y0, self.width, y1, frame))
+
+        return texture
+
+    def close(self):
+        # the views have to be released before the mapping can be closed
+        self.planes.clear()
+        self.index = self.chunk_data = None
+
+        if self.__owned:
+            try:
+                self.__data.close()
+            except BufferError:
+                # arrays of an exception traceback can still view the mapping, it is released once they are collected
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __readIndex(self, data, sections):
+        missing = {b'INFO', b'INDX', b'DATA'} - sections.keys()
+
+        if missing:
+            raise ValueError(f'.cart data is missing the {", ".join(tag.decode() for tag in sorted(missing))} sections')
+
+        if sections[b'INFO'][1] != CART_INFO.size:
+            raise ValueError('.cart compression info has an invalid size')
+
+        self.codec, self.chunk_size = CART_INFO.unpack_from(self.__data, sections[b'INFO'][0])
+
+        if self.codec not in CART_CODECS or self.chunk_size == 0:
+            raise ValueError('.cart data uses an unknown compression')
+
+        self.chunk_count_x = -(-self.width // self.chunk_size)
+        self.chunk_count = self.chunk_count_x * -(-self.height // self.chunk_size)
+
+        chunk_count = self.frames * self.chunk_count
+
+        offset, size = sections[b'INDX']
+
+        if size != chunk_count * CART_INDEX_ENTRY.itemsize:
+            raise ValueError('.cart chunk index does not fit the texture size')
+
+        self.index = np.frombuffer(self.__data, dtype=CART_INDEX_ENTRY, count=chunk_count, offset=offset)
+
+        offset, size = sections[b'DATA']
+        self.chunk_data = data[offset:offset + size]
+
+        # compared without adding the offset and the size, which could overflow
+        if ((self.index['offset'] > size) | (self.index['size'] > size - self.index['offset'])).any():
+            raise ValueError('.cart chunk index points outside of the chunk data')
+
+    def __readChunks(self, x0, y0, x1, y1, frame):
+        """decompresses the chunks of [frame] overlapping the given region and returns its cells"""
+
+        cells = np.zeros((y1 - y0, x1 - x0), dtype=CELL_DTYPE)
+
+        if x0 >= x1 or y0 >= y1:
+            return cells
+
+        size = self.chunk_size
+
+        for chunk_y in range(y0 // size, (y1 - 1) // size + 1):
+            for chunk_x in range(x0 // size, (x1 - 1) // size + 1):
+                offset, length = self.index[frame * self.chunk_count + chunk_y * self.chunk_count_x + chunk_x]
+
+                # empty chunks are not stored
+                if not length:
+                    continue
+
+                cx0, cy0 = chunk_x * size, chunk_y * size
+                cx1, cy1 = min(cx0 + size, self.width), min(cy0 + size, self.height)
+
+                chunk = decodeChunk(self.chunk_data[offset:offset + length], (cy1 - cy0, cx1 - cx0), self.codec)
+
+                sx0, sy0 = max(x0, cx0), max(y0, cy0)
+                sx1, sy1 = min(x1, cx1), min(y1, cy1)
+
+                cells[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = chunk[sy0 - cy0:sy1 - cy0, sx0 - cx0:sx1 - cx0]
+
+        return cells
+
+
+def readCart(buffer, chunked=False):
+    """
+    reads the version 1 .cart file contents in [buffer] into a TextureData, or a ChunkedTextureData if [chunked] is set.
+    the cells are decoded in blocks of rows. colors of 00000000 are treated as not set, like the exporter writes them.
+    """
+
+    data = np.frombuffer(buffer, dtype=np.uint8)
+
+    if len(data) < CART_HEADER_SIZE:
+        raise ValueError('.cart data is too small to hold the texture size')
+
+    width, height = (int(val) for val in data[:CART_HEADER_SIZE].view('<u8'))
+    body = data[CART_HEADER_SIZE:]
+
+    count = width * height
+
+    # every cell takes between 1 + 8 and 4 + 8 bytes
+    if not (1 + CART_COLORS_SIZE) * count <= len(body) <= (4 + CART_COLORS_SIZE) * count:
+        raise ValueError(f'.cart data of {len(body)} bytes cannot hold {width}x{height} cells')
+
+    # every character is a single byte, so the cells can be viewed as fixed size records
+    ascii_cells = len(body) == (1 + CART_COLORS_SIZE) * count
+
+    texture = _newTexture(width, height, chunked)
+    offset = 0
+
+    for y0, y1 in _rowBlocks(width, height):
+        block_count = (y1 - y0) * width
+
+        if ascii_cells:
+            records = body[offset:offset + block_count * CART_ASCII_CELL.itemsize].view(CART_ASCII_CELL)
+            offset += len(records) * CART_ASCII_CELL.itemsize
+
+            if (records['character'] >= 0x80).any():
+                raise ValueError('.cart data contains an invalid utf-8 character')
+
+            codepoints = records['character']
+            foreground = records['foreground']
+            background = records['background']
+        else:
+            block = body[offset:offset + block_count * (4 + CART_COLORS_SIZE)]
+
+            starts = cartCellStarts(block, block_count)
+            lengths = UTF8_LENGTHS[block[starts]]
+
+            codepoints = decodeUtf8(block, starts, lengths)
+
+            color_starts = (starts + lengths)[:, None]
+
+            foreground = block[color_starts + np.arange(4)]
+            background = block[color_starts + np.arange(4, 8)]
+
+            offset += int(starts[-1] + lengths[-1]) + CART_COLORS_SIZE
+
+        texture.setRegion(0, y0, _cells(codepoints, foreground, background).reshape(y1 - y0, width))
+
+    if offset != len(body):
+        raise ValueError('.cart data does not end after the last cell')
+
+    return texture
+
+
+def _newTexture(width, height, chunked):
+    return ChunkedTextureData(width, height) if chunked else TextureData(width, height)
+
+
+def _rowBlocks(width, height):
+    """
+    yields the rows (y0, y1) of the blocks a texture of [width] x [height] cells is decoded in.
+    blocks hold about BLOCK_CELLS cells, in whole rows of chunks so every chunk is written once.
+    """
+
+    block_height = max(1, BLOCK_CELLS // max(1, width))
+    block_height = max(CHUNK_SIZE, block_height - block_height % CHUNK_SIZE)
+
+    for y0 in range(0, height, block_height):
+        yield y0, min(y0 + block_height, height)
+
+
+def _cells(codepoints, foreground, background):
+    """returns the cells holding the given arrays of values, where zero values are not set"""
+
+    cells = np.zeros(codepoints.shape, dtype=CELL_DTYPE)
+
+    cells['character'] = codepoints
+    cells['foreground'] = foreground
+    cells['background'] = background
+
+    cells['mask'] = np.where(codepoints != 0, CHARACTER, 0) | \
+                    np.where(foreground.any(axis=-1), FOREGROUND, 0) | \
+                    np.where(background.any(axis=-1), BACKGROUND, 0)
+
+    return cells
+
+
+def _artSections(text):
+    """
+    splits the lines of an .art file into its sections.
+    returns a dict mapping every section name to the line number of its header and a list of (line number, row) pairs.
+    """
+
+    sections = {}
+    rows = None
+
+    for number, row in enumerate(text.split('\n'), 1):
+        row = row.removesuffix('\r')
+
+        if row.startswith('//'):
+            name = row[2:].strip().lower()
+
+            if name not in ART_SECTIONS:
+                raise ValueError(f'line {number}: unknown section {name}')
+
+            rows = []
+            sections[name] = (number, rows)
+
+        # empty lines separate the sections
+        elif row:
+            if rows is None:
+                raise ValueError(f'line {number}: expected a section header before any data')
+
+            rows.append((number, row))
+
+    missing = [name for name in ART_SECTIONS if name not in sections]
+
+    if missing:
+        raise ValueError(f'.art data is missing the {", ".join(missing)} sections')
+
+    return sections
+
+
+def _artSymbols(rows, width, height):
+    """
+    decodes the symbol [rows] into an array of codepoints of shape ([height], [width]).
+    every symbol takes up two characters, either the character and a space or 00 if it is not set.
+    rows where 00 is followed by a space as well are also accepted.
+    """
+
+    # the space after the last symbol may be missing
+    lines = [row + ' ' if len(row) == 2 * width - 1 else row for _, row in rows]
+
+    symbols = np.zeros((height, 2 * width), dtype='<u4')
+
+    fixed = np.array([len(line) == 2 * width for line in lines])
+
+    if fixed.any():
+        data = ''.join(line for line, is_fixed in zip(lines, fixed) if is_fixed).encode('utf-32-le')
+        symbols[fixed] = np.frombuffer(data, dtype='<u4').reshape(-1, 2 * width)
+
+    unset = (symbols[:, ::2] == ord('0')) & (symbols[:, 1::2] == ord('0'))
+
+    # rows of the right length which do not split into symbols are read as rows with separated unset symbols
+    fixed &= ((symbols[:, 1::2] == ord(' ')) | unset).all(axis=1)
+
+    symbols[:, ::2][unset & fixed[:, None]] = 0
+    symbols[:, 1::2][unset & fixed[:, None]] = ord(' ')
+
+    for i in np.flatnonzero(~fixed):
+        row = rows[i][1]
+        line = (row + ' ' if row.endswith('00') else row).replace('00 ', '\x00 ')
+
+        if len(line) == 2 * width - 1:
+            line += ' '
+
+        if len(line) != 2 * width:
+            raise ValueError(f'line {rows[i][0]}: expected {width} symbols separated by spaces')
+
+        symbols[i] = np.frombuffer(line.encode('utf-32-le'), dtype='<u4')
+
+    bad_rows = np.flatnonzero((symbols[:, 1::2] != ord(' ')).any(axis=1))
+
+    if len(bad_rows):
+        raise ValueError(f'line {rows[bad_rows[0]][0]}: symbols must be separated by single spaces')
+
+    return symbols[:, ::2]
+
+
+def _artColors(rows, width, height):
+    """decodes the hex color [rows] into an rgba array of shape ([height], [width], 4)"""
+
+    lines = [row.rstrip(' ') + ' ' for _, row in rows]
+
+    for i, line in enumerate(lines):
+        if len(line) != 9 * width:
+            raise ValueError(f'line {rows[i][0]}: expected {width} colors of 8 hex digits separated by spaces')
+
+    try:
+        data = ''.join(lines).encode('ascii')
+    except UnicodeEncodeError as error:
+        raise ValueError(f'line {rows[error.start // max(1, 9 * width)][0]}: colors must be hex digits') from None
+
+    colors = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 9)
+
+    digits = HEX_VALUES[colors[..., :8]]
+
+    bad_rows = np.flatnonzero((digits < 0).any(axis=(1, 2)) | (colors[..., 8] != ord(' ')).any(axis=1))
+
+    if len(bad_rows):
+        raise ValueError(f'line {rows[bad_rows[0]][0]}: colors must be 8 hex digits separated by single spaces')
+
+    return (digits[..., 0::2] << 4 | digits[..., 1::2]).astype(np.uint8)
+
+
+def _mapFile(path):
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < CART_HEADER_SIZE:
+            raise ValueError(f'{path} is too small to be a .cart file')
+
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def cartCellStarts(body, count):
+    """
+    returns the offsets of the first [count] cells in the .cart cell data [body].
+    the offset of a cell depends on the length of every previous character, so the offsets are found by pointer jumping:
+    every byte points to where the next cell would start if a cell started at it, and these pointers are combined
+    until they skip over [count] cells, which takes log2([count]) vectorized passes instead of one step per cell.
+    """
+
+    size = len(body)
+
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    lengths = UTF8_LENGTHS[body]
+
+    # invalid leading bytes are skipped as if they were a single byte and reported afterwards
+    jump = np.arange(size + 1, dtype=np.int64)
+    jump[:size] += np.maximum(lengths, 1) + CART_COLORS_SIZE
+    np.minimum(jump, size, out=jump)
+
+    starts = np.zeros(1, dtype=np.int64)
+
+    # [jump] skips len(starts) cells, so it extends the known offsets to twice as many cells
+    while True:
+        starts = np.concatenate((starts, jump[starts]))
+
+        if len(starts) >= count:
+            break
+
+        jump = jump[jump]
+
+    starts = starts[:count]
+
+    if starts[-1] >= size or (lengths[starts] == 0).any():
+        raise ValueError('.cart data contains an invalid utf-8 character')
+
+    # the cells may be followed by the cells of the next block, but the last one has to fit
+    if starts[-1] + lengths[starts[-1]] + CART_COLORS_SIZE > size:
+        raise ValueError('.cart data ends inside of the last cell')
+
+    return starts
+
+
+def decodeUtf8(data, starts, lengths):
+    """decodes the utf-8 sequences of [lengths] bytes starting at [starts] in the uint8 array [data]"""
+
+    codepoints = data[starts] & UTF8_LEAD_MASKS[lengths]
+
+    for i in range(1, 4):
+        has_byte = lengths > i
+
+        codepoints[has_byte] = (codepoints[has_byte] << 6) | (data[starts[has_byte] + i] & 0x3f)
+
+    return codepoints
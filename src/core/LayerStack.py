@@ -0,0 +1,228 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from src.core.TextureData import TextureData, CELL_DTYPE, compositeCells, unpackCell
+from src.core.ChunkedTextureData import ChunkedTextureData, CHUNK_SIZE
+
+
+class Layer:
+    """a texture of a layer stack, hidden layers are left out when the stack is flattened"""
+
+    __slots__ = ('texture', 'name', 'visible', 'locked')
+
+    def __init__(self, texture, name, visible=True, locked=False):
+        self.texture = texture
+        self.name = name
+        self.visible = visible
+        self.locked = locked
+
+
+class LayerStack:
+    """
+    stores equally sized layers, from the lowest to the topmost one.
+    the stack is flattened by drawing the visible layers on top of each other, where values which are unset
+    in a layer fall through to the layers below it.
+    flattened cells are cached in tiles of TILE_SIZE x TILE_SIZE cells, so after a layer has changed
+    only the tiles passed to [invalidate] are composited again.
+    provides the reading methods of TextureData, so a stack can be displayed like a single texture.
+    the stack starts with the Layer objects in [layers] if given, otherwise with a single empty layer.
+    """
+
+    TILE_SIZE = CHUNK_SIZE
+
+    # maximum number of flattened tiles which are cached
+    TILE_CACHE = 1024
+
+    def __init__(self, width=0, height=0, chunked=True, layers=None):
+        # chunked layers only allocate the parts which are not empty
+        self.chunked = chunked
+
+        self.layers = []
+        self.active = 0
+
+        # maps (tile_x, tile_y) to the flattened cells of the tile, in the order they were last used
+        self.tiles = OrderedDict()
+
+        # counts the created layers, to give every layer a new name
+        self.__created = 0
+
+        if layers:
+            self.layers = list(layers)
+            self.__created = len(self.layers)
+        else:
+            self.addLayer(width, height)
+
+    @property
+    def width(self):
+        return self.layers[0].texture.width
+
+    @property
+    def height(self):
+        return self.layers[0].texture.height
+
+    @property
+    def active_layer(self):
+        return self.layers[self.active]
+
+    def addLayer(self, width=None, height=None):
+        """adds an empty layer above the active layer and makes it the active layer"""
+
+        if self.layers:
+            width, height = self.width, self.height
+
+        texture = ChunkedTextureData(width, height) if self.chunked else TextureData(width, height)
+
+        self.__created += 1
+
+        self.active = min(self.active + 1, len(self.layers))
+        self.layers.insert(self.active, Layer(texture, f"Layer {self.__created}"))
+
+        # an empty layer does not change the flattened cells, so the cache stays valid
+
+        return self.active_layer
+
+    def removeLayer(self, index=None):
+        """removes the layer at [index] or the active layer, the last layer can not be removed"""
+
+        if len(self.layers) == 1:
+            return None
+
+        index = self.active if index is None else index
+
+        active = self.active_layer
+        layer = self.layers.pop(index)
+
+        # the active layer stays active, if it was removed the layer which took its place becomes active
+        self.active = self.layers.index(active) if active is not layer else min(index, len(self.layers) - 1)
+        self.invalidateAll()
+
+        return layer
+
+    def moveLayer(self, index, step):
+        """moves the layer at [index] up by [step] layers, or down if [step] is negative"""
+
+        target = min(max(index + step, 0), len(self.layers) - 1)
+
+        if target == index:
+            return
+
+        active = self.active_layer
+
+        self.layers.insert(target, self.layers.pop(index))
+
+        self.active = self.layers.index(active)
+
+        self.invalidateAll()
+
+    def setVisible(self, index, visible):
+        if self.layers[index].visible != visible:
+            self.layers[index].visible = visible
+            self.invalidateAll()
+
+    def share(self):
+        """returns a copy of the stack whose layers share their unchanged chunks with the layers of this stack"""
+
+        layers = [Layer(layer.texture.share(), layer.name, layer.visible, layer.locked) for layer in self.layers]
+
+        stack = type(self)(self.width, self.height, self.chunked, layers)
+        stack.active = self.active
+        stack.__created = self.__created
+
+        return stack
+
+    def nbytes(self, seen=None):
+        """returns the size in bytes of the cells of every layer, chunks whose id is in the set [seen] are not counted"""
+
+        seen = set() if seen is None else seen
+
+        return sum(layer.texture.nbytes(seen) for layer in self.layers)
+
+    def visibleTexture(self):
+        """returns the texture of the only visible layer, which holds the flattened cells, or None otherwise"""
+
+        visible = [layer for layer in self.layers if layer.visible]
+
+        return visible[0].texture if len(visible) == 1 else None
+
+    def hasTexture(self, texture):
+        """returns if [texture] is the texture of one of the layers"""
+
+        return any(layer.texture is texture for layer in self.layers)
+
+    def invalidate(self, x0, y0, x1, y1):
+        """drops the flattened cells of every tile overlapping the given region, call this after a layer has changed"""
+
+        tx0, ty0 = max(x0, 0) // self.TILE_SIZE, max(y0, 0) // self.TILE_SIZE
+        tx1, ty1 = -(-x1 // self.TILE_SIZE), -(-y1 // self.TILE_SIZE)
+
+        # small regions are looked up directly, large ones filtered from the cached tiles
+        if (tx1 - tx0) * (ty1 - ty0) <= len(self.tiles):
+            for ty in range(ty0, ty1):
+                for tx in range(tx0, tx1):
+                    self.tiles.pop((tx, ty), None)
+        else:
+            for key in [key for key in self.tiles if tx0 <= key[0] < tx1 and ty0 <= key[1] < ty1]:
+                del self.tiles[key]
+
+    def invalidateAll(self):
+        self.tiles.clear()
+
+    def region(self, x0, y0, x1, y1):
+        """returns a copy of the flattened cells inside the given region"""
+
+        # a single layer is its own flattened result
+        texture = self.visibleTexture()
+
+        if texture is not None:
+            return texture.region(x0, y0, x1, y1)
+
+        visible = [layer for layer in self.layers if layer.visible]
+
+        cells = np.zeros((y1 - y0, x1 - x0), dtype=CELL_DTYPE)
+
+        for ty in range(y0 // self.TILE_SIZE, -(-y1 // self.TILE_SIZE)):
+            for tx in range(x0 // self.TILE_SIZE, -(-x1 // self.TILE_SIZE)):
+                tile = self.__tile(tx, ty, visible)
+
+                bx0, by0 = tx * self.TILE_SIZE, ty * self.TILE_SIZE
+
+                ix0, iy0 = max(x0, bx0), max(y0, by0)
+                ix1, iy1 = min(x1, bx0 + tile.shape[1]), min(y1, by0 + tile.shape[0])
+
+                cells[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = tile[iy0 - by0:iy1 - by0, ix0 - bx0:ix1 - bx0]
+
+        return cells
+
+    def get(self, x, y):
+        """returns a PaletteData view of the flattened cell at [x], [y]"""
+
+        return unpackCell(self.region(x, y, x + 1, y + 1)[0, 0])
+
+    def __tile(self, tx, ty, visible):
+        """returns the flattened cells of the tile at [tx], [ty], compositing the [visible] layers if it is not cached"""
+
+        tile = self.tiles.get((tx, ty))
+
+        if tile is not None:
+            self.tiles.move_to_end((tx, ty))
+            return tile
+
+        x0, y0 = tx * self.TILE_SIZE, ty * self.TILE_SIZE
+        x1, y1 = min(x0 + self.TILE_SIZE, self.width), min(y0 + self.TILE_SIZE, self.height)
+
+        tile = np.zeros((y1 - y0, x1 - x0), dtype=CELL_DTYPE)
+
+        for layer in visible:
+            # tiles line up with chunks, so empty chunks of a layer can be skipped
+            if isinstance(layer.texture, ChunkedTextureData) and layer.texture.chunkAt(tx, ty) is None:
+                continue
+
+            compositeCells(tile, layer.texture.region(x0, y0, x1, y1))
+
+        self.tiles[(tx, ty)] = tile
+
+        if len(self.tiles) > self.TILE_CACHE:
+            self.tiles.popitem(last=False)
+
+        return tile
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def lineCells(x0, y0, x1, y1):
+    """
+    returns the index arrays (xs, ys) of the cells on the line from [x0], [y0] to [x1], [y1], both ends included.
+    the line is connected and takes one cell per step along its longer axis, like bresenham's algorithm,
+    but all steps are computed at once.
+    """
+
+    dx, dy = x1 - x0, y1 - y0
+    steps = max(abs(dx), abs(dy))
+
+    if steps == 0:
+        return np.array([x0], dtype=np.intp), np.array([y0], dtype=np.intp)
+
+    step = np.arange(steps + 1, dtype=np.intp)
+
+    # offset along each axis rounded to the nearest cell with integer math, the longer axis advances every step
+    xs = x0 + np.sign(dx) * ((2 * step * abs(dx) + steps) // (2 * steps))
+    ys = y0 + np.sign(dy) * ((2 * step * abs(dy) + steps) // (2 * steps))
+
+    return xs, ys
@@ -0,0 +1,77 @@
+class PaletteData:
+    """
+    immutable character, foreground and background color of a cell, each of them is None if it is not set.
+    palette data is compared and hashed by a single packed integer, so it can be used as dict keys and set members.
+    use replace to get a copy with some of the values changed.
+    """
+
+    __slots__ = ('__character', '__foreground', '__background', '__key')
+
+    def __init__(self, character=None, foreground=None, background=None):
+        set_value = super().__setattr__
+
+        set_value('_PaletteData__character', character)
+        set_value('_PaletteData__foreground', foreground)
+        set_value('_PaletteData__background', background)
+
+        # the set values are stored in the lowest 3 bits, followed by the codepoint and both packed rgba values
+        key = (character is not None) | (foreground is not None) << 1 | (background is not None) << 2
+
+        if character is not None:
+            key |= ord(character) << 3
+        if foreground is not None:
+            key |= foreground.value << 24
+        if background is not None:
+            key |= background.value << 56
+
+        set_value('_PaletteData__key', key)
+
+    @property
+    def character(self):
+        return self.__character
+
+    @property
+    def foreground_color(self):
+        return self.__foreground
+
+    @property
+    def background_color(self):
+        return self.__background
+
+    @property
+    def key(self):
+        """all values packed into a single integer, equal palette data has equal keys"""
+
+        return self.__key
+
+    def replace(self, **changes):
+        """returns a copy with the values passed as [character], [foreground] or [background] replaced"""
+
+        values = {'character': self.__character, 'foreground': self.__foreground, 'background': self.__background}
+        values.update(changes)
+
+        return type(self)(**values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PaletteData is immutable, use replace to change its values")
+
+    def __delattr__(self, name):
+        raise AttributeError("PaletteData is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.__character, self.__foreground, self.__background)
+
+    def __repr__(self):
+        return f"PaletteData({self.__character!r}, {self.__foreground!r}, {self.__background!r})"
+
+    def __hash__(self):
+        return hash(self.__key)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        if not isinstance(other, PaletteData):
+            return NotImplemented
+
+        return self.__key == other.__key
@@ -0,0 +1,123 @@
+from weakref import WeakValueDictionary
+
+# two digit lowercase hex string of every channel value
+HEX_CHANNELS = tuple(format(val, '02x') for val in range(256))
+
+
+class RGBA:
+    """
+    immutable rgba color, which can be converted to different representations.
+    colors are interned, so creating a color which is already in use returns the existing object,
+    and they can be used as dict keys and set members.
+    """
+
+    __slots__ = ('__rgba', '__value', '__hex', '__weakref__')
+
+    # maps the packed value of every color in use to its object
+    __interned = WeakValueDictionary()
+
+    def __new__(cls, c_val=(0, 0, 0, 255)):
+        """color values should be in range 0-255 and should be passed as lists or a string with hex values.
+        if only three values are passed, a fourth alpha value will be appended with the value 255"""
+
+        if type(c_val) is list or type(c_val) is tuple:
+            if len(c_val) == 3:
+                rgba = (*c_val, 255)
+            elif len(c_val) == 4:
+                rgba = tuple(c_val)
+            else:
+                raise ValueError("Invalid number of channels passed to constructor ", len(c_val))
+        elif type(c_val) is str:
+            if c_val[0] == '#':
+                c_val = c_val[1:]
+
+            if len(c_val) == 6:
+                c_val += 'ff'
+            elif len(c_val) != 8:
+                raise ValueError("Invalid number of channels passed to constructor")
+
+            rgba = tuple(bytes.fromhex(c_val))
+        else:
+            raise TypeError("Invalid type passed to constructor ", type(c_val))
+
+        if not all(type(val) is int and 0 <= val <= 255 for val in rgba):
+            rgba = tuple(int(val) for val in rgba)
+
+            if not all(0 <= val <= 255 for val in rgba):
+                raise ValueError("Color values must be in range 0-255 ", rgba)
+
+        value = rgba[0] << 24 | rgba[1] << 16 | rgba[2] << 8 | rgba[3]
+
+        color = cls.__interned.get(value)
+
+        if color is None:
+            color = super().__new__(cls)
+
+            object.__setattr__(color, '_RGBA__rgba', rgba)
+            object.__setattr__(color, '_RGBA__value', value)
+            object.__setattr__(color, '_RGBA__hex', None)
+
+            cls.__interned[value] = color
+
+        return color
+
+    @property
+    def red(self):
+        return self.__rgba[0]
+
+    @property
+    def green(self):
+        return self.__rgba[1]
+
+    @property
+    def blue(self):
+        return self.__rgba[2]
+
+    @property
+    def alpha(self):
+        return self.__rgba[3]
+
+    @property
+    def value(self):
+        """the color packed into an integer as 0xRRGGBBAA"""
+
+        return self.__value
+
+    def rgba(self):
+        return self.__rgba
+
+    def rgbaHex(self):
+        if self.__hex is None:
+            object.__setattr__(self, '_RGBA__hex', '#' + ''.join(HEX_CHANNELS[val] for val in self.__rgba))
+
+        return self.__hex
+
+    def rgb(self):
+        return self.__rgba[:3]
+
+    def rgbHex(self):
+        return self.rgbaHex()[:7]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RGBA colors are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("RGBA colors are immutable")
+
+    def __reduce__(self):
+        return type(self), (self.__rgba,)
+
+    def __str__(self):
+        return f"{self.red} {self.green} {self.blue} {self.alpha}"
+
+    def __repr__(self):
+        return f"RGBA({self.rgbaHex()!r})"
+
+    def __hash__(self):
+        return hash(self.__value)
+
+    def __eq__(self, other):
+        if not isinstance(other, RGBA):
+            return NotImplemented
+
+        return self.__value == other.__value
@@ -0,0 +1,50 @@
+import numpy as np
+
+from src.core.GlyphAtlas import blend, cellSize, DEFAULT_FOREGROUND, GRID_COLOR
+from src.core.TextureData import FOREGROUND, BACKGROUND
+
+# maximum number of pixels blended at once, larger textures are rasterized in bands of rows
+BAND_PIXELS = 1 << 22
+
+
+def rasterize(cells, font, atlas, background, foreground=DEFAULT_FOREGROUND, grid=GRID_COLOR, out=None):
+    """
+    rasterizes the array of [cells] with shape (height, width) in a single vectorized pass.
+    the alpha masks of the characters are gathered from the GlyphAtlas [atlas] and blended with the colors of the cells.
+    [background] and [foreground] are used for cells where the corresponding color is not set.
+    returns an rgba array of shape (height * char_height, width * char_width, 4), written to [out] if it is passed.
+    """
+
+    height, width = cells.shape
+    char_width, char_height = cellSize(font)
+
+    if out is None:
+        out = np.empty((height * char_height, width * char_width, 4), dtype=np.uint8)
+
+    if cells.size == 0:
+        return out
+
+    # look up every distinct character once, and index the masks per cell afterwards
+    codepoints, inverse = np.unique(cells['character'], return_inverse=True)
+    inverse = inverse.reshape(cells.shape)
+
+    masks = atlas.masks(font, codepoints)
+
+    band_height = max(1, BAND_PIXELS // (width * char_width * char_height))
+
+    # view of [out] with one (char_height, char_width, 4) block per cell
+    cell_view = out.reshape(height, char_height, width, char_width, 4).transpose(0, 2, 1, 3, 4)
+
+    for y0 in range(0, height, band_height):
+        y1 = min(y0 + band_height, height)
+        band = cells[y0:y1]
+
+        has_fg = (band['mask'] & FOREGROUND).astype(bool)[..., None]
+        has_bg = (band['mask'] & BACKGROUND).astype(bool)[..., None]
+
+        blend(masks[inverse[y0:y1]],
+              np.where(has_fg, band['foreground'], np.asarray(foreground, dtype=np.uint8)),
+              np.where(has_bg, band['background'], np.asarray(background, dtype=np.uint8)),
+              grid, out=cell_view[y0:y1])
+
+    return out
@@ -0,0 +1,183 @@
+import numpy as np
+
+from src.core.PaletteData import PaletteData
+from src.core.RGBA import RGBA
+
+# bits stored in the [mask] field of a cell, a cleared bit means the corresponding value is unset
+CHARACTER = 0b001
+FOREGROUND = 0b010
+BACKGROUND = 0b100
+
+# mask bit and field name of every value of a cell
+CELL_FIELDS = ((CHARACTER, 'character'), (FOREGROUND, 'foreground'), (BACKGROUND, 'background'))
+
+# a single cell takes up 13 bytes: a codepoint, two rgba colors and the mask bits
+CELL_DTYPE = np.dtype([('character', '<u4'),
+                       ('foreground', 'u1', (4,)),
+                       ('background', 'u1', (4,)),
+                       ('mask', 'u1')])
+
+
+def packCell(data):
+    """converts a PaletteData object to a single cell of type CELL_DTYPE"""
+
+    cell = np.zeros((), dtype=CELL_DTYPE)
+
+    if data.character:
+        cell['character'] = ord(data.character)
+        cell['mask'] |= CHARACTER
+
+    if data.foreground_color:
+        cell['foreground'] = data.foreground_color.rgba()
+        cell['mask'] |= FOREGROUND
+
+    if data.background_color:
+        cell['background'] = data.background_color.rgba()
+        cell['mask'] |= BACKGROUND
+
+    return cell
+
+
+def unpackCell(cell):
+    """converts a single cell of type CELL_DTYPE to a PaletteData object"""
+
+    mask = int(cell['mask'])
+
+    return PaletteData(chr(cell['character']) if mask & CHARACTER else None,
+                       RGBA(cell['foreground'].tolist()) if mask & FOREGROUND else None,
+                       RGBA(cell['background'].tolist()) if mask & BACKGROUND else None)
+
+
+def paintCells(cells, cell):
+    """
+    writes the values set in the packed [cell] to every cell of the array [cells] in place.
+    values which are not set in [cell] are left untouched.
+    """
+
+    for bit, field in CELL_FIELDS:
+        if cell['mask'] & bit:
+            cells[field] = cell[field]
+
+    cells['mask'] |= cell['mask']
+
+
+def compositeCells(cells, over):
+    """
+    writes the values set in the array [over] to the array [cells] of the same shape in place.
+    values which are not set in a cell of [over] leave the cell below untouched.
+    """
+
+    for bit, field in CELL_FIELDS:
+        is_set = (over['mask'] & bit) != 0
+
+        cells[field][is_set] = over[field][is_set]
+
+    cells['mask'] |= over['mask']
+
+
+def cellBytes(cells):
+    """returns a uint8 view of [cells] with an extra last axis holding the raw bytes of each cell"""
+
+    return np.ascontiguousarray(cells).view(np.uint8).reshape(cells.shape + (CELL_DTYPE.itemsize,))
+
+
+class TextureData:
+    """
+    stores the cells of a texture in a numpy structured array of shape (height, width).
+    fields which are not set in a cell are always zero, so two textures can be compared byte by byte.
+    all regions are given as half open ranges, [x0, x1) and [y0, y1).
+    """
+
+    def __init__(self, width=0, height=0, cells=None):
+        if cells is None:
+            cells = np.zeros((height, width), dtype=CELL_DTYPE)
+
+        self.cells = cells
+
+    @property
+    def width(self):
+        return self.cells.shape[1]
+
+    @property
+    def height(self):
+        return self.cells.shape[0]
+
+    def get(self, x, y):
+        """returns a PaletteData view of the cell at [x], [y]"""
+
+        return unpackCell(self.cells[y, x])
+
+    def set(self, x, y, data):
+        """replaces the cell at [x], [y] with the values of the PaletteData [data]"""
+
+        self.cells[y, x] = packCell(data)
+
+    def region(self, x0, y0, x1, y1):
+        """returns a copy of the cells inside the given region"""
+
+        return self.cells[y0:y1, x0:x1].copy()
+
+    def setRegion(self, x, y, cells):
+        """writes the array [cells] into the texture with its upper left corner at [x], [y]"""
+
+        self.cells[y:y + cells.shape[0], x:x + cells.shape[1]] = cells
+
+    def gather(self, ys, xs):
+        """returns a copy of the cells at the index arrays [ys], [xs]"""
+
+        return self.cells[ys, xs]
+
+    def scatter(self, ys, xs, cells):
+        """writes [cells] to the cells at the index arrays [ys], [xs]"""
+
+        self.cells[ys, xs] = cells
+
+    def paint(self, x0, y0, x1, y1, data):
+        """
+        writes the values of the PaletteData [data] to every cell in the given region.
+        values which are not set in [data] are left untouched.
+        """
+
+        paintCells(self.cells[y0:y1, x0:x1], packCell(data))
+
+    def erase(self, x0, y0, x1, y1):
+        """unsets every value of the cells in the given region"""
+
+        self.cells[y0:y1, x0:x1] = np.zeros((), dtype=CELL_DTYPE)
+
+    def occupied(self, x0, y0, x1, y1):
+        """returns the index arrays (ys, xs) of every non empty cell in the given region"""
+
+        ys, xs = np.nonzero(self.cells[y0:y1, x0:x1]['mask'])
+
+        return ys + y0, xs + x0
+
+    def resize(self, width, height):
+        """
+        Resizes the texture to [width] and [height].
+        Cells outside the new area are deleted and new areas are filled with empty cells.
+        """
+
+        cells = np.zeros((height, width), dtype=CELL_DTYPE)
+
+        copy_width = min(width, self.width)
+        copy_height = min(height, self.height)
+
+        cells[:copy_height, :copy_width] = self.cells[:copy_height, :copy_width]
+
+        self.cells = cells
+
+    def copy(self):
+        return type(self)(cells=self.cells.copy())
+
+    def share(self):
+        """all cells are stored in a single array, so they can not be shared and a full copy is returned"""
+
+        return self.copy()
+
+    def nbytes(self, seen=None):
+        return self.cells.nbytes
+
+    def __eq__(self, other):
+        return isinstance(other, TextureData) and self.cells.shape == other.cells.shape and \
+               np.array_equal(cellBytes(self.cells), cellBytes(other.cells))
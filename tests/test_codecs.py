@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from src.core.TextureData import TextureData, PaletteData, cellBytes
+from src.core.RGBA import RGBA
+from src.core.Exporter import exportArt, exportCart, exportFrames
+from src.core.Importer import importArt, importCart, importCartFrames, readArt
+
+# every way a texture can be written, as (suffix, writer)
+FORMATS = {
+    'art': ('.art', exportArt),
+    'cart1': ('.cart', lambda texture, path: exportCart(texture, path, version=1)),
+    'cart2': ('.cart', lambda texture, path: exportCart(texture, path, version=2)),
+    'cart3': ('.cartz', lambda texture, path: exportCart(texture, path, version=3)),
+}
+
+
+def readTexture(path, chunked=False):
+    return importArt(path, chunked) if path.suffix == '.art' else importCart(path, chunked)
+
+
+def randomTexture(width, height, characters, seed=0):
+    """returns a texture of random boxes of the given [characters], with some colors and some unset values"""
+
+    rng = np.random.default_rng(seed)
+    texture = TextureData(width, height)
+
+    for _ in range(20 if width and height else 0):
+        x0, y0 = rng.integers(0, width), rng.integers(0, height)
+        x1, y1 = x0 + rng.integers(1, 20), y0 + rng.integers(1, 20)
+
+        texture.paint(x0, y0, x1, y1, PaletteData(
+            str(rng.choice(characters)) if rng.random() < 0.8 else None,
+            RGBA(tuple(int(val) for val in rng.integers(0, 256, 4))) if rng.random() < 0.5 else None,
+            RGBA((10, 20, 30, 255)) if rng.random() < 0.3 else None))
+
+    return texture
+
+
+def assertSameCells(texture, expected):
+    assert (texture.width, texture.height) == (expected.width, expected.height)
+
+    cells = texture.region(0, 0, texture.width, texture.height)
+    assert np.array_equal(cellBytes(cells), cellBytes(expected.cells))
+
+
+@pytest.mark.parametrize('name', FORMATS)
+@pytest.mark.parametrize('chunked', (False, True))
+@pytest.mark.parametrize('characters', ('ab0 ', 'aé中😀'), ids=('ascii', 'multibyte'))
+def test_roundtrip(tmp_path, name, chunked, characters):
+    suffix, write = FORMATS[name]
+    texture = randomTexture(70, 45, list(characters))
+
+    path = tmp_path / f'texture{suffix}'
+    write(texture, path)
+
+    assertSameCells(readTexture(path, chunked), texture)
+
+
+@pytest.mark.parametrize('name', FORMATS)
+@pytest.mark.parametrize('size', ((0, 0), (3, 0), (0, 3)))
+def test_empty_sizes(tmp_path, name, size):
+    suffix, write = FORMATS[name]
+    texture = TextureData(*size)
+
+    path = tmp_path / f'texture{suffix}'
+    write(texture, path)
+
+    assertSameCells(readTexture(path), texture)
+
+
+@pytest.mark.parametrize('name', FORMATS)
+def test_truncated(tmp_path, name):
+    suffix, write = FORMATS[name]
+
+    path = tmp_path / f'texture{suffix}'
+    write(randomTexture(40, 30, ['x', '中']), path)
+
+    data = path.read_bytes()
+
+    # cut inside of the last value, as .art files may end without a newline
+    for size in (0, 8, len(data) // 2, len(data) - 5):
+        path.write_bytes(data[:size])
+
+        with pytest.raises(ValueError):
+            readTexture(path)
+
+
+def test_corrupt_chunks(tmp_path):
+    path = tmp_path / 'texture.cartz'
+    exportCart(randomTexture(150, 90, ['x', '中']), path, version=3)
+
+    data = bytearray(path.read_bytes())
+    rng = np.random.default_rng(1)
+
+    # flipped bits either go unnoticed or are reported as a ValueError, never as another error
+    for _ in range(300):
+        corrupt = bytearray(data)
+        corrupt[rng.integers(0, len(data))] ^= 1 << int(rng.integers(0, 8))
+        path.write_bytes(corrupt)
+
+        try:
+            importCart(path)
+        except ValueError:
+            pass
+
+
+def test_fixed_width_art_symbols():
+    # unset symbols take two characters without a separating space, rows with a separating space are read as well
+    text = '// size\n3 2\n\n// symbols\na 00b \n00 a 0 \n\n' \
+           '// foreground color\n' + '00000000 ' * 3 + '\n' + '00000000 ' * 3 + '\n\n' \
+           '// background color\n' + '00000000 ' * 3 + '\n' + '00000000 ' * 3 + '\n'
+
+    texture = readArt(text)
+
+    assert [texture.get(x, 0).character for x in range(3)] == ['a', None, 'b']
+    assert [texture.get(x, 1).character for x in range(3)] == [None, 'a', '0']
+
+
+@pytest.mark.parametrize('version', (2, 3))
+def test_frames(tmp_path, version):
+    frames = [randomTexture(50, 40, ['a', '中'], seed) for seed in range(3)]
+
+    path = tmp_path / 'frames.cart'
+    exportFrames(frames, path, version=version)
+
+    for texture, expected in zip(importCartFrames(path), frames, strict=True):
+        assertSameCells(texture, expected)
+
+    # readers of single textures get the first frame
+    assertSameCells(importCart(path), frames[0])